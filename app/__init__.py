@@ -3,45 +3,125 @@ from flask import Flask
 from flask_mail import Mail
 from flask_login import LoginManager
 from dotenv import load_dotenv
-from app.database.db import init_db
-from app.models.models import Base
+from app.database.db import remove_session
 
 load_dotenv()
 
-init_db(Base)
-
-app = Flask(__name__)
-
 login_manager = LoginManager()
-
-login_manager.init_app(app)
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 login_manager.login_message = 'You are not authorized to view this page. Please log in.'
 
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
-app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')
-app.config['MAIL_PORT'] = os.environ.get('MAIL_PORT')
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USE_SSL'] = False
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-app.config['DOMAIN'] = os.environ.get('DOMAIN')
-
-mail = Mail(app)
-
-
-from .main.routes import main
-from .auth.routes import auth
-from .auth.verify import verify
-from .quotes.routes import quotes
-from .profile.routes import profiles
-from .api.v1.routes import api
-
-# Register all blueprints
-app.register_blueprint(main)
-app.register_blueprint(auth)
-app.register_blueprint(verify)
-app.register_blueprint(quotes)
-app.register_blueprint(profiles)
-app.register_blueprint(api)
+mail = Mail()
+
+
+def create_app(config: dict = None) -> Flask:
+    '''
+    Creates and configures the app.
+
+    Nothing here talks to the database or starts a thread: caches and the
+    search index load on first use, so the app can be created without a
+    database and gunicorn can create it once before forking its workers.
+
+    Args:
+        config (dict): Settings overriding the ones read from the environment.
+
+    Returns:
+        flask.Flask: The app.
+    '''
+    app = Flask(__name__)
+
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY')
+    app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER')
+    app.config['MAIL_PORT'] = os.environ.get('MAIL_PORT')
+    app.config['MAIL_USE_TLS'] = os.environ.get('MAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
+    app.config['MAIL_USE_SSL'] = False
+    app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
+    app.config['DOMAIN'] = os.environ.get('DOMAIN')
+    app.config['SEARCH_INDEX_MAX_AGE'] = int(os.environ.get('SEARCH_INDEX_MAX_AGE', 300))
+    app.config['QUOTE_SAMPLER_RESYNC_INTERVAL'] = int(os.environ.get('QUOTE_SAMPLER_RESYNC_INTERVAL', 30))
+    app.config['REFERENCE_CACHE_TTL'] = int(os.environ.get('REFERENCE_CACHE_TTL', 300))
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 10000))
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60))
+    app.config['BCRYPT_ROUNDS'] = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    app.config['BCRYPT_WORKERS'] = int(os.environ.get('BCRYPT_WORKERS', 0))  # 0 for the number of CPUs
+    app.config['BCRYPT_MAX_QUEUE'] = int(os.environ.get('BCRYPT_MAX_QUEUE', 32))
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # unset to let anyone read /metrics
+    app.config['SQL_PROFILER'] = os.environ.get('SQL_PROFILER', 'false').lower() in ('1', 'true', 'yes')  # development only
+    app.config['SQL_N_PLUS_ONE'] = int(os.environ.get('SQL_N_PLUS_ONE', 3))
+    app.config['SQL_SLOW_QUERY_MS'] = int(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    app.config['SQL_QUERY_BUDGET'] = int(os.environ.get('SQL_QUERY_BUDGET', 0))  # 0 for no budget
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # share of requests profiled
+    app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')  # profiles requests sent with this X-Profile header
+    app.config['PROFILE_FORMAT'] = os.environ.get('PROFILE_FORMAT', 'collapsed')  # or pstats
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR')  # defaults to profiles/ under STATE_DIR
+    app.config['PROFILE_KEEP'] = int(os.environ.get('PROFILE_KEEP', 200))
+    if config:
+        app.config.update(config)
+
+    login_manager.init_app(app)
+    mail.init_app(app)
+
+    # Close the database session of each request
+    app.teardown_appcontext(remove_session)
+
+    from .main.routes import main
+    from .auth.routes import auth
+    from .auth.verify import verify
+    from .quotes.routes import quotes
+    from .profile.routes import profiles
+    from .api.v1.routes import api
+    from .monitoring.routes import monitoring
+
+    # Register all blueprints
+    app.register_blueprint(main)
+    app.register_blueprint(auth)
+    app.register_blueprint(verify)
+    app.register_blueprint(quotes)
+    app.register_blueprint(profiles)
+    app.register_blueprint(api)
+    app.register_blueprint(monitoring)
+
+    # Search quotes from an in-memory index, built on first use
+    from .search.quotes import quote_search
+
+    quote_search.init_app(app)
+
+    # Keep the ids of approved quotes in memory for random picks
+    from .quotes.sampling import quote_sampler
+
+    quote_sampler.init_app(app)
+
+    # Serve categories, countries, genders and roles from memory
+    from .cache.reference import reference_data
+
+    reference_data.init_app(app)
+
+    # Load logged in users from memory
+    from .cache.users import user_cache
+
+    user_cache.init_app(app)
+
+    # Hash passwords on a dedicated thread pool
+    from .auth.hashing import password_hasher
+
+    password_hasher.init_app(app)
+
+    # Count requests, their latency and SQL statements for /metrics
+    from .database.db import engine
+    from .monitoring.metrics import request_metrics
+
+    request_metrics.init_app(app, engine)
+
+    # Find N+1 and slow queries while developing
+    from .monitoring.profiler import query_profiler
+
+    query_profiler.init_app(app, engine)
+
+    # Profile sampled requests, wrapping the WSGI application
+    from .monitoring.sampling import sampling_profiler
+
+    sampling_profiler.init_app(app)
+
+    return app
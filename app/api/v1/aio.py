@@ -0,0 +1,144 @@
+import asyncio
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound, ServiceUnavailable
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+from app.database.aio import async_engine
+from app.models.models import Quote
+from app.search.quotes import quote_search
+from .caching import is_not_modified, is_settled, quotes_version
+from .pagination import InvalidCursor, decode_cursor, page_query, parse_limit, split_page
+from .routes import SEARCH_TIMEOUT
+from .serializers import approved_quotes_statement, QUOTE_ID_PLACEHOLDER, serialize_quote
+
+# The async variants of the read-only quote endpoints. They answer like the
+# views of the api blueprint, but wait on the database without holding a
+# thread, so one process can keep thousands of API connections open. The
+# other endpoints are left to the Flask app, see app/asgi.py.
+
+
+def json_response(request: Request, data, status: int = 200, headers: dict = None) -> Response:
+    '''Serializes data like jsonify does in the Flask app.'''
+    body = request.app.state.flask_app.json.dumps(data, separators=(',', ':')) + '\n'
+    return Response(body, status, headers, media_type='application/json')
+
+
+def error_response(error: HTTPException) -> Response:
+    '''Renders an HTTP error like the Flask app does.'''
+    return Response(error.get_body(), error.code, media_type='text/html')
+
+
+def conditional(view):
+    '''
+    Adds the ETag and Last-Modified headers of the quotes version to an async view.
+
+    Like caching.conditional: requests that already have the current version
+    get a 304 response without calling the view.
+    '''
+    async def wrapper(request: Request) -> Response:
+        version, modified = quotes_version.current()
+        if_none_match = parse_etags(request.headers.get('if-none-match'))
+        if_modified_since = parse_date(request.headers.get('if-modified-since'))
+
+        if is_not_modified(version, modified, if_none_match, if_modified_since):
+            response = Response(status_code=304)
+        else:
+            response = await view(request)
+            if response.status_code != 200:
+                return response
+
+        response.headers['ETag'] = quote_etag(version)
+        if is_settled(modified):
+            response.headers['Last-Modified'] = http_date(modified)
+        response.headers['Cache-Control'] = 'no-cache'  # always revalidate with the server
+        return response
+    wrapper.__name__ = view.__name__
+    return wrapper
+
+
+def quote_url_template(request: Request) -> str:
+    '''Returns the external URL of a quote with a placeholder for its ID.'''
+    return f"{str(request.base_url).rstrip('/')}/api/v1/quotes/{QUOTE_ID_PLACEHOLDER}"
+
+
+@conditional
+async def get_quote(request: Request) -> Response:
+    '''Retrieve a quote by its ID.'''
+    quote_id = str(request.path_params['quote_id'])
+    async with async_engine().connect() as connection:
+        result = await connection.execute(approved_quotes_statement().where(Quote.id == quote_id))
+        quote = result.first()
+    if not quote:
+        return error_response(NotFound(f'Quote with ID {quote_id} not found'))
+
+    return json_response(request, serialize_quote(quote, quote_url_template(request)))
+
+
+@conditional
+async def get_quotes(request: Request) -> Response:
+    '''Retrieve a page of quotes ordered by creation time.'''
+    try:
+        limit = parse_limit(request.query_params.get('limit'))
+        cursor = decode_cursor(request.query_params.get('cursor'))
+    except InvalidCursor as e:
+        return error_response(BadRequest(str(e)))
+
+    statement = page_query(approved_quotes_statement(), Quote.created_at, Quote.id, limit, cursor)
+    async with async_engine().connect() as connection:
+        rows = (await connection.execute(statement)).all()
+    quotes, next_cursor = split_page(rows, limit)
+
+    url_template = quote_url_template(request)
+    response = json_response(request, [serialize_quote(quote, url_template) for quote in quotes])
+    if next_cursor:
+        next_url = request.url_for('get_quotes').include_query_params(limit=limit, cursor=next_cursor)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+async def search_quotes(request: Request) -> Response:
+    '''Search quotes by their text and author.'''
+    request_args = request.query_params
+    if not request_args.get('q') and not request_args.get('author'):
+        return error_response(BadRequest('Missing search term'))
+
+    try:
+        limit = parse_limit(request_args.get('limit'))
+    except InvalidCursor as e:
+        return error_response(BadRequest(str(e)))
+
+    if request_args.get('q'):
+        query, fields = request_args['q'], None
+    else:
+        query, fields = request_args['author'], ['author']
+
+    try:
+        # on a thread, the first search of a process waits for the index to be built
+        quote_ids = await asyncio.to_thread(quote_search.search, query, fields=fields, limit=limit,
+                                            timeout=SEARCH_TIMEOUT)
+    except TimeoutError:
+        return error_response(ServiceUnavailable('Search is not available yet, please try again later'))
+
+    if not quote_ids:
+        return json_response(request, [])
+
+    async with async_engine().connect() as connection:
+        result = await connection.execute(approved_quotes_statement().where(Quote.id.in_(quote_ids)))
+        quotes = result.all()
+
+    # keep the ranking of the search index
+    rank = {quote_id: position for position, quote_id in enumerate(quote_ids)}
+    quotes.sort(key=lambda quote: rank[str(quote.id)])
+
+    url_template = quote_url_template(request)
+    return json_response(request, [serialize_quote(quote, url_template) for quote in quotes])
+
+
+# the search route comes first, its path would otherwise be taken for a quote ID
+routes = [
+    Route('/api/v1/quotes', get_quotes, methods=['GET']),
+    Route('/api/v1/quotes/search', search_quotes, methods=['GET']),
+    Route('/api/v1/quotes/{quote_id:uuid}', get_quote, methods=['GET']),
+]
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from functools import wraps
+from flask import make_response, request
+from app.cache.versions import VersionStamp
+from app.quotes.signals import quote_created, quote_deleted, quote_updated
+
+# version of the approved quotes, bumped whenever one of them changes
+quotes_version = VersionStamp('quotes')
+
+
+def is_not_modified(version: str, modified, if_none_match, if_modified_since) -> bool:
+    '''
+    Tells whether a client already has the given version of the data.
+
+    Args:
+        version (str): The current version, sent as the ETag.
+        modified (datetime): The time of the last change.
+        if_none_match (werkzeug.datastructures.ETags): The parsed If-None-Match header.
+        if_modified_since (datetime): The parsed If-Modified-Since header, or None.
+
+    Returns:
+        bool: True if a 304 response can be sent.
+    '''
+    if if_none_match:
+        return if_none_match.contains_weak(version)
+    if if_modified_since:
+        return modified <= if_modified_since
+    return False
+
+
+def is_settled(modified) -> bool:
+    '''
+    Tells whether the time of the last change can be sent as Last-Modified.
+
+    A version stamp bumped during the current second carries the end of that
+    second, which a later bump in the same second would share. Until it has
+    passed, responses leave out Last-Modified and are validated by their ETag.
+    '''
+    return modified <= datetime.now(timezone.utc)
+
+
+def conditional(stamp: VersionStamp):
+    '''
+    Adds ETag and Last-Modified headers derived from a version stamp to a view.
+
+    Requests carrying a matching If-None-Match, or an If-Modified-Since not
+    older than the last change, get a 304 response without calling the view,
+    so no database query is made.
+
+    Args:
+        stamp (VersionStamp): The version of the data the view returns.
+    '''
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version, modified = stamp.current()
+
+            if is_not_modified(version, modified, request.if_none_match, request.if_modified_since):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(version)
+            if is_settled(modified):
+                response.last_modified = modified
+            response.cache_control.no_cache = True  # always revalidate with the server
+            return response
+        return wrapper
+    return decorator
+
+
+def _bump_if_approved(quote_id, **quote) -> None:
+    '''Bumps the quotes version when an approved quote changes.'''
+    if quote.get('approved'):
+        quotes_version.bump()
+
+
+quote_created.connect(_bump_if_approved)
+quote_updated.connect(_bump_if_approved)
+quote_deleted.connect(_bump_if_approved)
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from app.models.models import Quote
+from app.database.db import session
+from .pagination import after_cursor, decode_cursor, encode_cursor
+from .serializers import approved_quotes, quote_url_template, serialize_quote
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+CSV_COLUMNS = ['quote', 'category', 'author', 'created_at', 'quote_url', 'cursor']
+
+# number of rows fetched per round-trip, and written per chunk
+BATCH_SIZE = 1000
+
+
+def export_rows(cursor=None, batch_size: int = BATCH_SIZE):
+    '''
+    Streams approved quotes in (created_at, id) order.
+
+    The rows are read through a server-side cursor, batch_size at a time, so
+    memory use does not depend on the number of quotes. Must run within a
+    request context, which owns the session.
+
+    Args:
+        cursor (tuple): A decoded cursor to resume after, or None to start from the beginning.
+        batch_size (int): The number of rows fetched per round-trip.
+
+    Yields:
+        dict: The JSON representation of each quote, with the cursor to resume after it.
+    '''
+    s = session()
+    query = after_cursor(approved_quotes(s), Quote.created_at, Quote.id, cursor)\
+        .order_by(Quote.created_at, Quote.id)\
+        .yield_per(batch_size)
+    url_template = quote_url_template()
+    for row in query:
+        quote = serialize_quote(row, url_template)
+        quote['created_at'] = row.created_at.isoformat()
+        quote['cursor'] = encode_cursor(row.created_at, row.id)
+        yield quote
+
+
+def export_lines(format: str, cursor=None, header: bool = True, batch_size: int = BATCH_SIZE):
+    '''
+    Formats exported quotes as NDJSON or CSV.
+
+    Args:
+        format (str): 'ndjson' or 'csv'.
+        cursor (tuple): A decoded cursor to resume after.
+        header (bool): Whether to start a CSV export with its header row.
+        batch_size (int): The number of rows per yielded chunk.
+
+    Yields:
+        str: Chunks of up to batch_size lines.
+    '''
+    buffer = io.StringIO()
+    if format == 'csv':
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, lineterminator='\n')
+        if header:
+            writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda quote: buffer.write(json.dumps(quote, ensure_ascii=False) + '\n')
+
+    for count, quote in enumerate(export_rows(cursor, batch_size), 1):
+        write(quote)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def last_cursor(path: str, format: str):
+    '''Returns the cursor of the last complete row of a previous export, or None.'''
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - 64 * 1024, 0))
+        lines = f.read().decode('utf-8', errors='ignore').split('\n')
+    for line in reversed(lines[:-1]):  # the part after the last newline is incomplete
+        if format == 'csv':
+            cursor = next(csv.reader([line]), [None])[-1]
+        else:
+            try:
+                cursor = json.loads(line).get('cursor')
+            except ValueError:
+                cursor = None
+        if cursor and cursor != 'cursor':
+            return cursor
+    return None
+
+
+def main() -> None:
+    '''Exports approved quotes from the command line.'''
+    parser = argparse.ArgumentParser(description='Export approved quotes as NDJSON or CSV.')
+    parser.add_argument('--format', choices=FORMATS, default='ndjson', help='output format')
+    parser.add_argument('--output', '-o', help='file to write to (default: standard output)')
+    parser.add_argument('--cursor', help='resume after the row with this cursor')
+    parser.add_argument('--resume', action='store_true',
+                        help='append to --output, resuming after its last complete row')
+    parser.add_argument('--base-url', help='base of the quote URLs (default: DOMAIN setting)')
+    args = parser.parse_args()
+
+    from app import create_app
+
+    app = create_app()
+    cursor = args.cursor
+    resuming = args.resume and args.output and os.path.exists(args.output)
+    if resuming:
+        with open(args.output, 'rb+') as f:  # drop a partially written last line
+            tail_start = max(f.seek(0, os.SEEK_END) - 64 * 1024, 0)
+            f.seek(tail_start)
+            last_newline = f.read().rfind(b'\n')
+            if last_newline == -1 and tail_start > 0:
+                sys.exit(f'{args.output} has no complete row in its last 64 KiB, it cannot be resumed')
+            f.truncate(tail_start + last_newline + 1)
+        if last_newline == -1:
+            resuming = False  # not even a complete header, start over
+        else:
+            cursor = last_cursor(args.output, args.format)
+
+    output = open(args.output, 'a' if resuming else 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        with app.test_request_context(base_url=args.base_url or app.config.get('DOMAIN') or 'http://localhost'):
+            for chunk in export_lines(args.format, decode_cursor(cursor), header=not resuming):
+                output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
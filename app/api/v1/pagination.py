@@ -0,0 +1,140 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class InvalidCursor(ValueError):
+    '''Raised when a pagination cursor or limit cannot be parsed.'''
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    '''
+    Encodes the position of a row as an opaque cursor.
+
+    Args:
+        created_at (datetime): The creation time of the last row on the page.
+        id (str): The ID of the last row on the page.
+
+    Returns:
+        str: A url-safe token pointing just after the given row.
+    '''
+    payload = json.dumps([created_at.isoformat(), str(id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    '''
+    Decodes a cursor created by encode_cursor.
+
+    Args:
+        cursor (str): The token sent by the client, or None.
+
+    Returns:
+        tuple: (created_at, id) of the last row seen, or None if no cursor was given.
+
+    Raises:
+        InvalidCursor: If the token is malformed.
+    '''
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), str(id)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def parse_limit(limit: str) -> int:
+    '''
+    Parses the page size requested by the client.
+
+    Args:
+        limit (str): The raw limit query parameter, or None.
+
+    Returns:
+        int: The page size, capped at MAX_LIMIT.
+
+    Raises:
+        InvalidCursor: If the limit is not a positive integer.
+    '''
+    if limit is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise InvalidCursor('Limit must be an integer')
+    if limit < 1:
+        raise InvalidCursor('Limit must be greater than 0')
+    return min(limit, MAX_LIMIT)
+
+
+def after_cursor(query, created_at_column, id_column, cursor=None):
+    '''
+    Filters a query to the rows that come after a cursor in (created_at, id) order.
+
+    Args:
+        query (sqlalchemy.orm.Query): The query, or select statement, to filter.
+        created_at_column: The column holding the creation time.
+        id_column: The column holding the primary key.
+        cursor (tuple): A decoded cursor, or None to keep every row.
+
+    Returns:
+        sqlalchemy.orm.Query: The filtered query.
+    '''
+    if cursor is None:
+        return query
+    created_at, id = cursor
+    return query.filter(or_(created_at_column > created_at,
+                            and_(created_at_column == created_at, id_column > id)))
+
+
+def paginate(query, created_at_column, id_column, limit: int, cursor=None):
+    '''
+    Applies keyset pagination ordered by (created_at, id) to a query.
+
+    Only the rows of the requested page (plus one to detect the next page)
+    are fetched, so every page costs the same regardless of table size.
+
+    Args:
+        query (sqlalchemy.orm.Query): The filtered query to paginate.
+        created_at_column: The column holding the creation time.
+        id_column: The column holding the primary key.
+        limit (int): The page size.
+        cursor (tuple): The decoded cursor of the previous page, or None.
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page.
+    '''
+    rows = page_query(query, created_at_column, id_column, limit, cursor).all()
+    return split_page(rows, limit)
+
+
+def page_query(query, created_at_column, id_column, limit: int, cursor=None):
+    '''
+    Restricts a query or a select statement to a page and the first row of the next one.
+
+    Returns:
+        The query, ordered by (created_at, id) and limited to limit + 1 rows.
+    '''
+    query = after_cursor(query, created_at_column, id_column, cursor)
+    return query.order_by(created_at_column, id_column).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int):
+    '''
+    Splits the rows fetched by page_query into the page and the cursor of the next one.
+
+    Returns:
+        tuple: (rows, next_cursor) where next_cursor is None on the last page.
+    '''
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -1,12 +1,26 @@
-from flask import abort, Blueprint, jsonify, request, url_for
-from app import app
+from datetime import datetime, time, timedelta, timezone
+from flask import abort, Blueprint, jsonify, request, Response, stream_with_context, url_for
 from app.models.models import Quote
 from app.database.db import session
+from .serializers import approved_quotes, serialize_quote, serialize_quotes
+from app.cache.reference import reference_data
+from app.quotes.sampling import quote_sampler, utc_today
+from app.search.quotes import quote_search
+from .caching import conditional, quotes_version
+from .export import export_lines, FORMATS
+from .pagination import InvalidCursor, decode_cursor, paginate, parse_limit
 
 api = Blueprint('api', __name__, url_prefix='/api/v1')
 
+# seconds a search waits for the index to be built after startup
+SEARCH_TIMEOUT = 10
+
+# picks tried when the picked quote was removed by another process
+PICK_ATTEMPTS = 3
+
 
 @api.route('quotes/<string:quote_id>', methods=['GET'], strict_slashes=True)
+@conditional(quotes_version)
 def get_quote(quote_id):
     '''
     Retrieve a quote by its ID.
@@ -21,69 +35,194 @@ def get_quote(quote_id):
         404 error if the quote is not found.
     '''
     s = session()
-    quote = s.query(Quote).filter_by(id=quote_id, approved=True).first()
+    quote = approved_quotes(s).filter(Quote.id == quote_id).first()
+    s.close()
     if not quote:
         abort(404, f'Quote with ID {quote_id} not found')
-    
-    result = {
-        'quote': quote.quote,
-        'category': quote.category.category,
-        'author': quote.author,
-        'created_at': quote.created_at,
-        'quote_url': url_for('api.get_quote', quote_id=quote.id, _external=True)
-    }
-    
-    return jsonify(result), 200
+
+    return jsonify(serialize_quote(quote)), 200
 
 
 @api.route('quotes', methods=['GET'], strict_slashes=True)
+@conditional(quotes_version)
 def get_quotes():
     '''
-    Retrieve all quotes.
+    Retrieve a page of quotes ordered by creation time.
+
+    Query Args:
+        limit (int): The number of quotes per page (default 20, max 100).
+        cursor (str): The opaque token of the page to fetch, taken from the
+            `Link` header of the previous response.
 
     Returns:
-        A JSON representation of all quotes.
+        A JSON representation of the page of quotes, with a `Link` header
+        pointing to the next page if there is one.
     '''
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = decode_cursor(request.args.get('cursor'))
+    except InvalidCursor as e:
+        abort(400, str(e))
+
     s = session()
-    quotes = s.query(Quote).filter_by(approved=True).all()
-    result = []
-    for quote in quotes:
-        result.append({
-            'quote': quote.quote,
-            'category': quote.category.category,
-            'author': quote.author,
-            'created_at': quote.created_at,
-            'quote_url': url_for('api.get_quote', quote_id=quote.id, _external=True)
-        })
-    return jsonify(result), 200
+    quotes, next_cursor = paginate(approved_quotes(s), Quote.created_at, Quote.id, limit, cursor)
+    s.close()
+
+    response = jsonify(serialize_quotes(quotes))
+    if next_cursor:
+        next_url = url_for('api.get_quotes', limit=limit, cursor=next_cursor, _external=True)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+
+@api.route('quotes/export', methods=['GET'], strict_slashes=True)
+def export_quotes():
+    '''
+    Stream every approved quote, oldest first.
+
+    Query Args:
+        format (str): 'ndjson' (default) or 'csv'.
+        cursor (str): Resume after the row carrying this cursor, to continue
+            an export whose connection dropped.
+
+    Returns:
+        One quote per line, each with the cursor to resume after it.
+    '''
+    format = request.args.get('format', 'ndjson')
+    if format not in FORMATS:
+        abort(400, f'Format must be one of {", ".join(FORMATS)}')
+
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+    except InvalidCursor as e:
+        abort(400, str(e))
+
+    # the request context, and its session, stay open until the last row is sent
+    lines = stream_with_context(export_lines(format, cursor, header=cursor is None))
+    response = Response(lines, mimetype=FORMATS[format])
+    response.headers['Content-Disposition'] = f'attachment; filename=quotes.{format}'
+    return response
 
 
 @api.route('quotes/search', methods=['GET'], strict_slashes=True)
 def search_quotes():
     '''
-    Search quotes by author.
+    Search quotes by their text and author.
+
+    Matching tolerates prefixes ("einst") and single typos ("einstien").
+
+    Query Args:
+        q (str): Words to look for in the quote and its author.
+        author (str): Words to look for in the author only, used when q is missing.
+        limit (int): The maximum number of results (default 20, max 100).
 
     Returns:
-        A JSON representation of all quotes matching the search term.
+        A JSON representation of the matching quotes, best match first.
     '''
 
     request_args = request.args.to_dict()  # get request args as a dict
 
     # check if search term is present
-    if 'author' not in request_args:
+    if not request_args.get('q') and not request_args.get('author'):
         abort(400, 'Missing search term')
 
+    try:
+        limit = parse_limit(request_args.get('limit'))
+    except InvalidCursor as e:
+        abort(400, str(e))
+
+    if request_args.get('q'):
+        query, fields = request_args['q'], None
+    else:
+        query, fields = request_args['author'], ['author']
+
+    try:
+        quote_ids = quote_search.search(query, fields=fields, limit=limit, timeout=SEARCH_TIMEOUT)
+    except TimeoutError:
+        abort(503, 'Search is not available yet, please try again later')
+
+    if not quote_ids:
+        return jsonify([]), 200
+
     s = session()  # create a session
+    quotes = approved_quotes(s).filter(Quote.id.in_(quote_ids)).all()
+    s.close()
+
+    # keep the ranking of the search index
+    rank = {quote_id: position for position, quote_id in enumerate(quote_ids)}
+    quotes.sort(key=lambda quote: rank[str(quote.id)])
+
+    return jsonify(serialize_quotes(quotes)), 200
+
+
+def _approved_quote(quote_id: str):
+    '''Fetches an approved quote picked by the sampler, forgetting it if it is gone.'''
+    s = session()
+    quote = approved_quotes(s).filter(Quote.id == quote_id).first()
+    s.close()
+    if not quote:
+        quote_sampler.discard(quote_id)  # deleted or rejected by another process
+    return quote
+
+
+@api.route('quotes/random', methods=['GET'], strict_slashes=True)
+def get_random_quote():
+    '''
+    Retrieve a random quote.
 
-    # search for quotes by author
-    quotes = s.query(Quote).filter_by(author=request_args.get('author')).filter_by(approved=True).all()
+    Query Args:
+        category (str): The name of the category to pick from.
 
-    # convert quotes to a list of dicts
-    results = [{
-        'quote': quote.quote,
-        'category': quote.category.category,
-        'author': quote.author,
-        'created_at': quote.created_at,
-        'quote_url': url_for('api.get_quote', quote_id=quote.id, _external=True)} for quote in quotes]
+    Returns:
+        A JSON representation of the quote.
+
+    Raises:
+        404 error if the category does not exist or has no quotes.
+    '''
+    category_id = None
+    if request.args.get('category'):
+        categories = {name.lower(): id for id, name in reference_data.categories()}
+        category_id = categories.get(request.args['category'].lower())
+        if category_id is None:
+            abort(404, f'Category {request.args["category"]} not found')
+
+    for _ in range(PICK_ATTEMPTS):
+        quote_id = quote_sampler.random(category_id)
+        if quote_id is None:
+            break
+        quote = _approved_quote(quote_id)
+        if quote:
+            response = jsonify(serialize_quote(quote))
+            response.cache_control.no_store = True
+            return response, 200
+
+    abort(404, 'No quotes found')
+
+
+@api.route('quotes/today', methods=['GET'], strict_slashes=True)
+def get_quote_of_the_day():
+    '''
+    Retrieve the quote of the day.
+
+    The quote changes at midnight UTC and responses may be cached until then.
 
-    return jsonify(results), 200
+    Returns:
+        A JSON representation of the quote.
+    '''
+    today = utc_today()
+    for _ in range(PICK_ATTEMPTS):
+        quote_id = quote_sampler.today(today)
+        if quote_id is None:
+            break
+        quote = _approved_quote(quote_id)
+        if quote:
+            tomorrow = datetime.combine(today + timedelta(days=1), time.min, timezone.utc)
+            response = jsonify(serialize_quote(quote))
+            response.set_etag(f'{today.isoformat()}-{quote_id}')
+            response.cache_control.public = True
+            response.cache_control.max_age = int((tomorrow - datetime.now(timezone.utc)).total_seconds())
+            response.expires = tomorrow
+            return response.make_conditional(request)
+
+    abort(404, 'No quotes found')
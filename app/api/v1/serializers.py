@@ -0,0 +1,66 @@
+from flask import url_for
+from sqlalchemy import select
+from app.models.models import Category, Quote
+
+# placeholder substituted with each quote's ID in the precomputed URL template
+QUOTE_ID_PLACEHOLDER = '__quote_id__'
+
+
+def approved_quotes(s):
+    '''
+    Builds a query of approved quotes joined to their category.
+
+    Only the columns needed by the JSON representation are selected, so the
+    category name comes back in the same round-trip instead of being lazily
+    loaded for every row.
+
+    Args:
+        s (sqlalchemy.orm.Session): The session to query with.
+
+    Returns:
+        sqlalchemy.orm.Query: A query yielding (id, quote, author, created_at, category) rows.
+    '''
+    return s.query(Quote.id, Quote.quote, Quote.author, Quote.created_at, Category.category)\
+        .join(Category, Quote.category_id == Category.id)\
+        .filter(Quote.approved.is_(True))
+
+
+def approved_quotes_statement():
+    '''Builds the statement of approved_quotes as a select, for the async API.'''
+    return select(Quote.id, Quote.quote, Quote.author, Quote.created_at, Category.category)\
+        .join(Category, Quote.category_id == Category.id)\
+        .where(Quote.approved.is_(True))
+
+
+def quote_url_template() -> str:
+    '''Returns the external URL of a quote with a placeholder for its ID.'''
+    return url_for('api.get_quote', quote_id=QUOTE_ID_PLACEHOLDER, _external=True)
+
+
+def serialize_quote(row, url_template: str = None) -> dict:
+    '''
+    Converts a row from approved_quotes to its JSON representation.
+
+    Args:
+        row: A row returned by approved_quotes.
+        url_template (str): The result of quote_url_template, computed once
+            per request when serializing many rows.
+
+    Returns:
+        dict: The quote as returned by the API.
+    '''
+    if url_template is None:
+        url_template = quote_url_template()
+    return {
+        'quote': row.quote,
+        'category': row.category,
+        'author': row.author,
+        'created_at': row.created_at,
+        'quote_url': url_template.replace(QUOTE_ID_PLACEHOLDER, str(row.id))
+    }
+
+
+def serialize_quotes(rows) -> list:
+    '''Converts rows from approved_quotes to a list of JSON representations.'''
+    url_template = quote_url_template()
+    return [serialize_quote(row, url_template) for row in rows]
@@ -0,0 +1,46 @@
+'''
+ASGI entry point serving the read-only quote API on asyncio:
+
+    uvicorn --factory app.asgi:create_asgi_app
+
+GET /api/v1/quotes, /api/v1/quotes/search and /api/v1/quotes/<id> are
+answered by the async views of app/api/v1/aio.py, which wait on the
+database without holding a thread. Every other request goes to the Flask
+app, run on a pool of threads.
+'''
+import contextlib
+import os
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from .api.v1.aio import routes
+from .database.aio import dispose_async_engine
+
+# threads running the requests handled by the Flask app
+WSGI_THREADS = int(os.environ.get('WSGI_THREADS', 10))
+
+
+def create_asgi_app(flask_app=None) -> Starlette:
+    '''
+    Creates the ASGI app, mounting the Flask app behind the async API.
+
+    Args:
+        flask_app (flask.Flask): The app serving the other requests, created
+            with create_app when not given.
+
+    Returns:
+        starlette.applications.Starlette: The app.
+    '''
+    if flask_app is None:
+        from . import create_app
+        flask_app = create_app()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        await dispose_async_engine()
+
+    app = Starlette(routes=routes + [Mount('', app=WSGIMiddleware(flask_app, workers=WSGI_THREADS))],
+                    lifespan=lifespan)
+    app.state.flask_app = flask_app  # serializes the responses like the Flask views
+    return app
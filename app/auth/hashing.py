@@ -0,0 +1,109 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+class HasherBusy(Exception):
+    '''Raised when too many passwords are already waiting to be hashed.'''
+
+
+class PasswordHasher:
+    '''
+    Runs bcrypt on a small dedicated thread pool.
+
+    bcrypt releases the GIL, so hashing on a few threads of their own keeps a
+    burst of logins from pinning every thread serving requests. At most
+    `max_queue` passwords wait for a thread; beyond that HasherBusy is raised
+    instead of letting requests pile up.
+    '''
+
+    def __init__(self, rounds: int = 12, workers: int = None, max_queue: int = 32):
+        '''
+        Initialize password hasher.
+
+        Args:
+            rounds (int): The bcrypt work factor of new hashes.
+            workers (int): The number of hashing threads, defaults to the number of CPUs.
+            max_queue (int): The maximum number of passwords waiting for a thread.
+        '''
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self._metrics = {'hashes': 0, 'rejected': 0, 'hash_seconds': 0.0, 'max_hash_seconds': 0.0,
+                         'wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    def init_app(self, app) -> None:
+        '''Configures the hasher for an app.'''
+        self.rounds = app.config.get('BCRYPT_ROUNDS', self.rounds)
+        self.workers = app.config.get('BCRYPT_WORKERS') or self.workers
+        self.max_queue = app.config.get('BCRYPT_MAX_QUEUE', self.max_queue)
+
+    def _submit(self, function, *args):
+        '''Runs function on the pool and waits for its result.'''
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._metrics['rejected'] += 1
+                raise HasherBusy('Too many passwords are being hashed')
+            if self._pid != os.getpid():  # threads do not survive a fork
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='bcrypt')
+                self._pid = os.getpid()
+            self._pending += 1
+            executor = self._executor
+
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self._record(started - submitted, time.perf_counter() - started)
+
+        try:
+            return executor.submit(timed).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _record(self, wait: float, duration: float) -> None:
+        with self._lock:
+            metrics = self._metrics
+            metrics['hashes'] += 1
+            metrics['hash_seconds'] += duration
+            metrics['max_hash_seconds'] = max(metrics['max_hash_seconds'], duration)
+            metrics['wait_seconds'] += wait
+            metrics['max_wait_seconds'] = max(metrics['max_wait_seconds'], wait)
+
+    def hash(self, password: str) -> str:
+        '''Hashes a password with the configured work factor.'''
+        hashed = self._submit(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def check(self, password: str, hashed_password) -> bool:
+        '''Checks if a password matches a hash.'''
+        if isinstance(hashed_password, str):
+            hashed_password = hashed_password.encode('utf-8')
+        return self._submit(bcrypt.checkpw, password.encode('utf-8'), hashed_password)
+
+    def needs_rehash(self, hashed_password) -> bool:
+        '''Checks if a hash was made with another work factor than the configured one.'''
+        if isinstance(hashed_password, bytes):
+            hashed_password = hashed_password.decode('utf-8')
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds  # $2b$<rounds>$<salt and hash>
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self) -> dict:
+        '''Returns the number of hashes, their latency and queue wait, and rejected requests.'''
+        with self._lock:
+            return dict(self._metrics, pending=self._pending)
+
+
+password_hasher = PasswordHasher()
@@ -1,14 +1,17 @@
 import os
 from dotenv import load_dotenv
-from flask import (abort, Blueprint, render_template, request,
+from flask import (abort, Blueprint, current_app, render_template, request,
                    redirect, url_for, flash)
 from flask_login import current_user, login_required, login_user, logout_user
-from app import app, login_manager
+from app import login_manager
 from sqlalchemy.exc import IntegrityError
+from .hashing import HasherBusy, password_hasher
 from .utils import check_password, hash_password, send_password_reset_email
 from .verify import create_token, send_verification_email, verify_token
 from .forms import ForgotPasswordForm, LoginForm, RegisterForm, ResetPasswordForm
-from app.models.models import User, Role
+from app.cache.reference import reference_data
+from app.cache.users import user_cache
+from app.models.models import User
 from app.database.db import session
 
 load_dotenv()
@@ -16,13 +19,16 @@ load_dotenv()
 auth = Blueprint('auth', __name__, url_prefix='/auth')
 
 
+@auth.errorhandler(HasherBusy)
+def hasher_busy(e):
+    '''Asks the user to retry when too many passwords are being hashed.'''
+    return 'The server is busy, please try again in a moment.', 503, {'Retry-After': '1'}
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    '''Load user.'''
-    s = session()
-    user = s.query(User).filter_by(id=user_id).first()
-    s.close()
-    return user
+    '''Load user, from the user cache when possible.'''
+    return user_cache.get(user_id)
 
 
 # Register new user ########
@@ -60,11 +66,8 @@ def create_user():
     s = session()  # create session
     request_data['password'] = hash_password(request_data['password'])  # set password to hashed password
     
-    try:
-        role = s.query(Role).filter_by(role='user').first()
-        request_data['role_id'] = role.id  # set role to user
-    except (AttributeError, KeyError):
-        s.close()
+    request_data['role_id'] = reference_data.role_id('user')  # set role to user
+    if request_data['role_id'] is None:
         abort(500, description='Role does not exist') # abort if role does not exist
 
     user = User(email_address=request_data['email_address'], username=request_data['username'],
@@ -77,7 +80,7 @@ def create_user():
         flash(message='User already exists', category='error')
         return redirect(url_for('auth.register'))
     token = create_token(user)
-    send_verification_email(user.email_address, sender=app.config['MAIL_USERNAME'],
+    send_verification_email(user.email_address, sender=current_app.config['MAIL_USERNAME'],
                            token=token)
     flash(message='Account created successfully. Please check your email for verification link.', category='success')
     return redirect(url_for('auth.login'))
@@ -122,6 +125,11 @@ def authenticate_user():
         flash(message='Account is not verified. Please check your email for verification link.', category='info')
         return redirect(url_for('auth.login'))
 
+    # upgrade the hash when the configured work factor changed
+    if password_hasher.needs_rehash(user.password):
+        s.query(User).filter_by(id=user.id).update({'password': hash_password(str(request_data['password']))})
+        s.commit()
+
     # login user
     login_user(user)
     flash(message='You have been logged in successfully.', category='success')
@@ -164,7 +172,7 @@ def send_reset_link():
 
     token = create_token(user)
     username = user.profile[0].first_name + ' ' + user.profile[0].last_name
-    send_password_reset_email(email=user.email_address, sender=app.config['MAIL_USERNAME'], template='mail/reset-password.html', token=token, username=username)
+    send_password_reset_email(email=user.email_address, sender=current_app.config['MAIL_USERNAME'], template='mail/reset-password.html', token=token, username=username)
 
     flash(message='Reset password link sent!', category='success')
     return redirect(url_for('auth.login'))
@@ -213,5 +221,6 @@ def change_password():
         return redirect(url_for('auth.reset_password'))
     user.password = hash_password(form_data.password.data)
     s.commit()
+    user_cache.invalidate(user.id)
     flash(message='Password reset successfully!', category='success')
     return redirect(url_for('auth.login'))
@@ -1,20 +1,18 @@
 import re
-import bcrypt
-from app import app
-from email_validator import validate_email, EmailNotValidError
 from flask_mail import Message
-from app import mail
-from flask import render_template, url_for
+from flask import current_app, render_template, url_for
+from ..outbox.emails import queue_email
+from .hashing import password_hasher
 
 
-def hash_password(password: str) -> bytes:
-    '''Hashes password.'''
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+def hash_password(password: str) -> str:
+    '''Hashes password off the request thread.'''
+    return password_hasher.hash(password)
 
 
-def check_password(password: str, hashed_password: bytes) -> bool:
-    '''Checks if password matches hashed password.'''
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+def check_password(password: str, hashed_password: str) -> bool:
+    '''Checks if password matches hashed password off the request thread.'''
+    return password_hasher.check(password, hashed_password)
 
 
 def send_password_reset_email(email: str, sender: str, template: str, username: str, token: str):
@@ -24,8 +22,8 @@ def send_password_reset_email(email: str, sender: str, template: str, username:
         sender=sender
     )
 
-    message.html = render_template(template, domain=app.config['DOMAIN'], username=username, url=url_for('auth.reset_password'), token=token)
-    mail.send(message)
+    message.html = render_template(template, domain=current_app.config['DOMAIN'], username=username, url=url_for('auth.reset_password'), token=token)
+    queue_email(message)  # delivered by the outbox worker
 
 
 class ValidateCredentials:
@@ -41,6 +39,8 @@ class ValidateCredentials:
 
     def validate_email(self) -> bool:
         '''Validates email address.'''
+        from email_validator import validate_email, EmailNotValidError  # compiles many regexes on import
+
         try:
             email = validate_email(self.data['email_address'])
         except EmailNotValidError:
@@ -1,11 +1,12 @@
 import os
 import jwt
 from datetime import datetime, timedelta
-from flask import flash, Blueprint, request, render_template, redirect, url_for
+from flask import current_app, flash, Blueprint, request, render_template, redirect, url_for
 from dotenv import load_dotenv
 from flask_mail import Message
-from app import app, mail
+from ..cache.users import user_cache
 from ..models.models import User
+from ..outbox.emails import queue_email
 from ..database.db import session
 from .utils import send_password_reset_email
 
@@ -32,8 +33,8 @@ def send_verification_email(email: str, sender: str, token: str):
         sender=sender
     )
 
-    message.html = render_template('mail/verify-account.html', domain=app.config['DOMAIN'], token=token, url=url_for('verify.verify_email'))
-    mail.send(message)
+    message.html = render_template('mail/verify-account.html', domain=current_app.config['DOMAIN'], token=token, url=url_for('verify.verify_email'))
+    queue_email(message)  # delivered by the outbox worker
 
 
 def verify_token(token=None):
@@ -71,7 +72,7 @@ def request_token():
         return redirect(url_for('auth.login'))
 
     new_token = create_token(user)
-    send_verification_email(user.email_address, sender=app.config['DOMAIN'],
+    send_verification_email(user.email_address, sender=current_app.config['DOMAIN'],
                             token=new_token)
     flash(message='Verification email sent!', category='success')
     return redirect(url_for('auth.login'))
@@ -117,6 +118,7 @@ def verify_email():
         return render_template('auth/verification.html', domain=False)
     user.is_verified = True
     s.commit()
+    user_cache.invalidate(user.id)
     s.close()
     flash(message='Account verified successfully!', category='success')
     return redirect(url_for('auth.login'))
@@ -0,0 +1,83 @@
+import threading
+import time
+from sqlalchemy import select
+from ..database.db import engine
+from ..models.models import Category, Country, Gender, Role
+from .versions import VersionStamp
+
+# bumped by the seed scripts and invalidate() whenever the reference tables change
+reference_version = VersionStamp('reference')
+
+
+class ReferenceData:
+    '''
+    In-memory copy of the small lookup tables behind forms and registration.
+
+    Categories, countries, genders and roles are read together on first use
+    and kept until they are older than `ttl` seconds or the shared reference
+    version changes, so every process picks up new rows without a restart.
+    '''
+
+    def __init__(self, ttl: int = 300):
+        '''Initialize reference data.'''
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = None
+        self._loaded_at = None
+        self._version = None
+
+    def init_app(self, app) -> None:
+        '''Configures the cache for an app.'''
+        self.ttl = app.config.get('REFERENCE_CACHE_TTL', self.ttl)
+
+    def _load(self) -> dict:
+        '''Reads every reference table in one connection.'''
+        # a connection of its own, so the session of the current request is left alone
+        with engine.connect() as connection:
+            return {
+                'categories': tuple(connection.execute(select(Category.id, Category.category))),
+                'countries': tuple(connection.execute(
+                    select(Country.id, Country.country).order_by(Country.country))),
+                'genders': tuple(connection.execute(
+                    select(Gender.id, Gender.gender).order_by(Gender.gender))),
+                'roles': {role: id for role, id in connection.execute(select(Role.role, Role.id))},
+            }
+
+    def _get(self) -> dict:
+        '''Returns the cached tables, reloading them when stale.'''
+        version, _ = reference_version.current()
+        data = self._data
+        if data is not None and version == self._version and time.monotonic() - self._loaded_at < self.ttl:
+            return data
+
+        with self._lock:
+            if self._data is data or self._data is None:  # not reloaded by another thread meanwhile
+                self._data = self._load()
+                self._version = version
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def categories(self) -> list:
+        '''Returns (id, category) choices.'''
+        return [tuple(row) for row in self._get()['categories']]
+
+    def countries(self) -> list:
+        '''Returns (id, country) choices sorted by name.'''
+        return [tuple(row) for row in self._get()['countries']]
+
+    def genders(self) -> list:
+        '''Returns (id, gender) choices sorted by name.'''
+        return [tuple(row) for row in self._get()['genders']]
+
+    def role_id(self, role: str):
+        '''Returns the ID of a role, or None if it does not exist.'''
+        return self._get()['roles'].get(role)
+
+    def invalidate(self) -> None:
+        '''Drops the cached tables in every process.'''
+        reference_version.bump()
+        with self._lock:
+            self._data = None
+
+
+reference_data = ReferenceData()
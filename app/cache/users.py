@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from flask_login import UserMixin
+from ..database.db import session
+from ..models.models import User
+from .versions import VersionStamp
+
+# bumped whenever a user changes, so every process drops its snapshots
+users_version = VersionStamp('users')
+
+
+class UserSnapshot(UserMixin):
+    '''A detached, read-only copy of the columns of a user needed by every request.'''
+    __slots__ = ('id', 'email_address', 'username', 'role_id', 'is_verified')
+
+    def __init__(self, id, email_address, username, role_id, is_verified):
+        '''Initialize user snapshot.'''
+        for name, value in zip(self.__slots__, (id, email_address, username, role_id, is_verified)):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('User snapshots are read-only')
+
+    def get_id(self) -> str:
+        '''Get user id.'''
+        return self.id
+
+    def __str__(self) -> str:
+        return f'<UserSnapshot {self.id} {self.username}>'
+
+    def __repr__(self) -> str:
+        return f'UserSnapshot("{self.id}", "{self.username}")'
+
+
+class UserCache:
+    '''
+    Bounded LRU cache of user snapshots keyed by id, for Flask-Login's user_loader.
+
+    Snapshots expire after `ttl` seconds. Changing a user must call
+    invalidate, which also bumps the shared users version so the other
+    processes serving the app drop their snapshots too.
+    '''
+
+    def __init__(self, max_size: int = 10000, ttl: int = 60):
+        '''Initialize user cache.'''
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._users = OrderedDict()  # id -> (snapshot, loaded_at)
+        self._version = None
+
+    def init_app(self, app) -> None:
+        '''Configures the cache for an app.'''
+        self.max_size = app.config.get('USER_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('USER_CACHE_TTL', self.ttl)
+
+    def get(self, user_id: str):
+        '''
+        Returns the snapshot of a user, loading it on a miss.
+
+        Args:
+            user_id (str): The id stored in the login session.
+
+        Returns:
+            UserSnapshot: The user, or None if it does not exist.
+        '''
+        version, _ = users_version.current()
+        now = time.monotonic()
+        with self._lock:
+            if version != self._version:
+                self._users.clear()
+                self._version = version
+            cached = self._users.get(user_id)
+            if cached is not None and now - cached[1] < self.ttl:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        user = load_snapshot(user_id)
+        if user is None:
+            return None  # never cache missing users, they may sign up later
+
+        with self._lock:
+            if version == self._version:  # not invalidated while loading
+                self._users[user_id] = (user, now)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_size:
+                    self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id: str = None) -> None:
+        '''Drops the snapshot of a user, in this and every other process.'''
+        users_version.bump()
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        '''Returns the number of cached users, hits and misses.'''
+        with self._lock:
+            return {'size': len(self._users), 'hits': self.hits, 'misses': self.misses}
+
+
+def load_snapshot(user_id: str):
+    '''Reads the snapshot of a user from the database.'''
+    s = session()
+    row = s.query(User.id, User.email_address, User.username, User.role_id, User.is_verified)\
+        .filter(User.id == user_id).first()
+    return UserSnapshot(*row) if row else None
+
+
+user_cache = UserCache()
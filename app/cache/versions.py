@@ -0,0 +1,54 @@
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+
+# directory holding the version files, shared by every process of the app
+STATE_DIR = os.environ.get('STATE_DIR') or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'instance')
+
+
+class VersionStamp:
+    '''
+    A version token shared by every process through a small file.
+
+    Reading the current version opens and reads a few bytes, which is far
+    cheaper than any database round-trip. The file's modification time
+    doubles as the time of the last change, set to the end of the second of
+    the bump so that every later bump has a later time in whole seconds.
+    '''
+
+    def __init__(self, name: str, directory: str = None):
+        '''Initialize version stamp.'''
+        self.name = name
+        self.path = os.path.join(directory or STATE_DIR, f'{name}.version')
+
+    def current(self) -> tuple:
+        '''
+        Returns the current version.
+
+        Returns:
+            tuple: (version, modified) where version is an opaque string and
+            modified the UTC time at which the second of the last bump ended.
+        '''
+        try:
+            f = open(self.path)
+        except FileNotFoundError:
+            self.bump()
+            f = open(self.path)
+        with f:
+            version = f.read().strip()
+            mtime = os.fstat(f.fileno()).st_mtime
+        return version, datetime.fromtimestamp(mtime, timezone.utc).replace(microsecond=0)
+
+    def bump(self) -> str:
+        '''Replaces the version with a new one and returns it.'''
+        version = secrets.token_hex(8)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write(version)
+        modified = int(time.time()) + 1
+        os.utime(temporary_path, (modified, modified))
+        os.replace(temporary_path, self.path)  # atomic, readers never see a partial file
+        return version
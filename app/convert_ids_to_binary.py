@@ -0,0 +1,135 @@
+import argparse
+import time
+from sqlalchemy import func, inspect, MetaData, select, String, Table, text
+from models.models import Base
+from models.types import BinaryUUID
+from database.db import engine
+
+# suffix of the original tables while their rows are copied
+LEGACY_SUFFIX = '_legacy'
+
+# number of rows copied per transaction
+BATCH_SIZE = 5000
+
+
+def has_string_ids(connection, table_name: str) -> bool:
+    '''Checks if the id column of a table still stores UUIDs as strings.'''
+    for column in inspect(connection).get_columns(table_name):
+        if column['name'] == 'id':
+            return isinstance(column['type'], String)
+    return False
+
+
+def set_foreign_key_checks(connection, enabled: bool) -> None:
+    '''Turns foreign key checks on or off for a connection.'''
+    if connection.dialect.name == 'mysql':
+        connection.execute(text(f'SET FOREIGN_KEY_CHECKS = {int(enabled)}'))
+    elif connection.dialect.name == 'sqlite':
+        connection.execute(text(f'PRAGMA foreign_keys = {"ON" if enabled else "OFF"}'))
+
+
+def rename_legacy_tables(tables: list) -> None:
+    '''Moves the tables with string ids aside and creates them again with binary ids.'''
+    with engine.begin() as connection:
+        set_foreign_key_checks(connection, False)
+        for table in tables:
+            legacy_name = table.name + LEGACY_SUFFIX
+            connection.execute(text(f'ALTER TABLE {table.name} RENAME TO {legacy_name}'))
+            if connection.dialect.name == 'sqlite':
+                # SQLite index names are global and would clash with the new table's
+                for index in inspect(connection).get_indexes(legacy_name):
+                    connection.execute(text(f'DROP INDEX {index["name"]}'))
+        set_foreign_key_checks(connection, True)
+    Base.metadata.create_all(engine, tables=tables)
+
+
+def copy_rows(table: Table, batch_size: int = BATCH_SIZE) -> int:
+    '''
+    Copies the rows of a legacy table into its new table, converting ids.
+
+    Rows are copied in id order, batch_size per transaction, starting after
+    the last id already copied, so an interrupted copy can be resumed.
+
+    Returns:
+        int: The number of rows copied.
+    '''
+    with engine.connect() as connection:
+        legacy = Table(table.name + LEGACY_SUFFIX, MetaData(), autoload_with=connection)
+        last_id = connection.execute(select(func.max(table.c.id))).scalar()
+
+    # BinaryUUID converts the canonical strings of the legacy table when binding
+    columns = [column.name for column in legacy.columns if column.name in table.c]
+    query = select(*[legacy.c[name] for name in columns]).order_by(legacy.c.id).limit(batch_size)
+
+    copied = 0
+    started = time.perf_counter()
+    while True:
+        with engine.begin() as connection:
+            batch_query = query if last_id is None else query.where(legacy.c.id > last_id)
+            rows = [dict(row._mapping) for row in connection.execute(batch_query)]
+            if not rows:
+                break
+            connection.execute(table.insert(), rows)
+        last_id = rows[-1]['id']
+        copied += len(rows)
+        print(f'{table.name}: {copied} rows copied ({copied / (time.perf_counter() - started):.0f} rows/s)')
+    return copied
+
+
+def convert(batch_size: int = BATCH_SIZE, keep_legacy: bool = False) -> None:
+    '''
+    Converts every table from string UUIDs to 16-byte binary UUIDs.
+
+    Each table is renamed with LEGACY_SUFFIX and created again with binary id
+    and foreign key columns, then its rows are copied over in batches. Once
+    every row has been copied the legacy tables are dropped. Running the
+    command again resumes an interrupted conversion.
+
+    Args:
+        batch_size (int): The number of rows copied per transaction.
+        keep_legacy (bool): Keep the legacy tables instead of dropping them.
+    '''
+    tables = [table for table in Base.metadata.sorted_tables
+              if any(isinstance(column.type, BinaryUUID) for column in table.columns)]
+
+    with engine.connect() as connection:
+        existing = set(inspect(connection).get_table_names())
+        to_rename = [table for table in tables
+                     if table.name in existing and table.name + LEGACY_SUFFIX not in existing
+                     and has_string_ids(connection, table.name)]
+    if to_rename:
+        rename_legacy_tables(to_rename)
+        existing.update(table.name + LEGACY_SUFFIX for table in to_rename)
+
+    to_copy = [table for table in tables if table.name + LEGACY_SUFFIX in existing]  # parents first
+    if not to_copy:
+        print('Every table already uses binary ids.')
+        return
+
+    for table in to_copy:
+        copy_rows(table, batch_size)
+
+    with engine.begin() as connection:
+        for table in to_copy:
+            legacy_name = table.name + LEGACY_SUFFIX
+            legacy_count = connection.execute(text(f'SELECT COUNT(*) FROM {legacy_name}')).scalar()
+            count = connection.execute(select(func.count()).select_from(table)).scalar()
+            if count != legacy_count:
+                raise RuntimeError(f'{table.name} has {count} rows but {legacy_name} has {legacy_count}')
+
+        if not keep_legacy:
+            set_foreign_key_checks(connection, False)
+            for table in reversed(to_copy):
+                connection.execute(text(f'DROP TABLE {table.name + LEGACY_SUFFIX}'))
+            set_foreign_key_checks(connection, True)
+    print(f'Converted {len(to_copy)} tables to binary ids.')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert string UUID ids to 16-byte binary UUIDs.')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='number of rows copied per transaction')
+    parser.add_argument('--keep-legacy', action='store_true',
+                        help='keep the original tables, suffixed with _legacy')
+    args = parser.parse_args()
+    convert(args.batch_size, args.keep_legacy)
@@ -10,7 +10,19 @@ DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 DB_NAME_TEST = os.getenv("DB_NAME_TEST")
 
-if os.environ.get("FLASK_ENV") == "test":
+# connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))  # below MySQL's wait_timeout
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+if os.environ.get("DATABASE_URL"):
+    DB_URI = os.environ.get("DATABASE_URL")
+elif os.environ.get("FLASK_ENV") == "test":
     DB_URI = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME_TEST}"
 else:
     DB_URI = f"mysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# the database of the async API, defaults to DB_URI through an asyncio driver
+ASYNC_DB_URI = os.environ.get("ASYNC_DATABASE_URL")
@@ -0,0 +1,41 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+from . import ASYNC_DB_URI, DB_URI
+from .db import pool_options
+
+# asyncio driver used for each dialect
+ASYNC_DRIVERS = {'mysql': 'mysql+aiomysql', 'sqlite': 'sqlite+aiosqlite'}
+
+_engine = None
+
+
+def async_uri(uri: str) -> str:
+    '''Switches a database URL to the asyncio driver of its dialect.'''
+    scheme, rest = uri.split('://', 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+
+def async_engine():
+    '''
+    Returns the asyncio engine of the async API, created on first use.
+
+    It reaches the same database as the engine of the Flask app, through
+    aiomysql (or aiosqlite for SQLite URLs), with the same pool settings.
+    Creating it late keeps the async drivers out of processes that only
+    serve the Flask app.
+
+    Returns:
+        sqlalchemy.ext.asyncio.AsyncEngine: The engine.
+    '''
+    global _engine
+    if _engine is None:
+        uri = ASYNC_DB_URI or async_uri(DB_URI)
+        _engine = create_async_engine(uri, **pool_options(uri))
+    return _engine
+
+
+async def dispose_async_engine() -> None:
+    '''Closes the connections of the asyncio engine, if it was created.'''
+    global _engine
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
@@ -1,23 +1,89 @@
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
-from . import DB_URI
+from . import DB_URI, DB_MAX_OVERFLOW, DB_POOL_PRE_PING, DB_POOL_RECYCLE, DB_POOL_SIZE, DB_POOL_TIMEOUT
 
-engine = create_engine(DB_URI)
 
+def pool_options(uri: str) -> dict:
+    '''Returns the connection pool settings passed to create_engine.'''
+    if uri.startswith('sqlite'):
+        return {}  # SQLite picks its own pool and has no server to lose connections to
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
 
-def init_db(base):
-    '''Creates the database tables'''
-    base.metadata.create_all(engine)
+
+engine = create_engine(DB_URI, **pool_options(DB_URI))
+
+# one session per thread, i.e. per request, removed when the request ends
+Session = scoped_session(sessionmaker(bind=engine, autocommit=False, autoflush=False))
+
+_stats_lock = threading.Lock()
+_stats = {'connects': 0, 'checkouts': 0, 'checkins': 0, 'max_checked_out': 0, 'max_overflow': 0}
+
+
+@event.listens_for(engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    with _stats_lock:
+        _stats['connects'] += 1
+
+
+@event.listens_for(engine, 'checkout')
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool = engine.pool
+    with _stats_lock:
+        _stats['checkouts'] += 1
+        if hasattr(pool, 'checkedout'):
+            _stats['max_checked_out'] = max(_stats['max_checked_out'], pool.checkedout())
+            _stats['max_overflow'] = max(_stats['max_overflow'], pool.overflow())
+
+
+@event.listens_for(engine, 'checkin')
+def _on_checkin(dbapi_connection, connection_record):
+    with _stats_lock:
+        _stats['checkins'] += 1
 
 
 def session():
     '''
-    Creates a new SQLAlchemy session.
+    Returns the SQLAlchemy session of the current request.
+
+    Every call made while handling a request (or on the same thread) returns
+    the same session, which is closed by remove_session when the request ends.
+
+    Returns:
+    session (sqlalchemy.orm.Session): The session of the current request.
+    '''
+    return Session()
+
+
+def remove_session(exception=None) -> None:
+    '''Closes the session of the current request and returns its connection to the pool.'''
+    Session.remove()
+
+
+def pool_stats() -> dict:
+    '''
+    Reports the state of the connection pool for monitoring.
 
     Returns:
-    session (sqlalchemy.orm.Session): A new SQLAlchemy session.
+        dict: The pool size, the connections checked out, idle and in
+        overflow right now, the peaks of checked out and overflow
+        connections, and the total number of connects, checkouts and checkins.
     '''
-    Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
-    session_factory = scoped_session(Session)
-    session = session_factory()
-    return session
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if hasattr(pool, 'checkedout'):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+        })
+    with _stats_lock:
+        stats.update(_stats)
+    return stats
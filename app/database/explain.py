@@ -0,0 +1,121 @@
+import argparse
+import re
+import sys
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.api.v1.pagination import DEFAULT_LIMIT, paginate
+from app.api.v1.serializers import approved_quotes
+from app.models.models import Category, Quote, User
+from app.models.types import uuid7
+from .db import engine
+
+# tables small enough to be read whole: categories, countries, genders and roles
+SMALL_TABLES = {'categories', 'countries', 'genders', 'roles'}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def hot_queries() -> dict:
+    '''
+    Builds the queries run on every request or worker poll, the way the app runs them.
+
+    Returns:
+        dict: Functions running each query with a session, by name.
+    '''
+    id, other_id = uuid7(), uuid7()
+    cursor = (datetime(2000, 1, 1), id)
+    return {
+        'api.get_quotes': lambda s: paginate(approved_quotes(s), Quote.created_at, Quote.id, DEFAULT_LIMIT),
+        'api.get_quotes (next page)': lambda s: paginate(approved_quotes(s), Quote.created_at, Quote.id,
+                                                         DEFAULT_LIMIT, cursor),
+        'api.get_quote': lambda s: approved_quotes(s).filter(Quote.id == id).first(),
+        'api.search_quotes': lambda s: approved_quotes(s).filter(Quote.id.in_([id, other_id])).all(),
+        'quotes.get_quotes': lambda s: s.query(Quote).filter_by(user_id=id).join(Category).all(),
+        'quotes.get_quote_status': lambda s: s.query(Quote.id, Quote.status, Quote.approved)
+            .filter_by(id=id, user_id=other_id).first(),
+        'auth.login': lambda s: s.query(User).filter_by(email_address='someone@example.com').first(),
+        'auth.load_user': lambda s: s.query(User.id, User.email_address).filter(User.id == id).first(),
+        'moderation.worker': lambda s: s.query(Quote).filter(Quote.status == Quote.PENDING)
+            .order_by(Quote.created_at).limit(64).all(),
+    }
+
+
+def capture_statements(connection, run) -> list:
+    '''Runs a query and returns the SQL statements and parameters sent to the database.'''
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection, 'before_cursor_execute', capture)
+    try:
+        with Session(bind=connection) as s:
+            run(s)
+    finally:
+        event.remove(connection, 'before_cursor_execute', capture)
+    return statements
+
+
+def full_scans(connection, statement: str, parameters) -> list:
+    '''
+    Explains a statement and returns the tables it reads in full.
+
+    Returns:
+        list: The names of the tables scanned without an index, reference tables left out.
+    '''
+    if connection.dialect.name == 'sqlite':
+        plan = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        tables = [match.group(1) for match in (SQLITE_SCAN.match(row.detail) for row in plan)
+                  if match and 'USING' not in match.string]
+    else:
+        plan = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings()
+        tables = [row['table'] for row in plan if row['type'] in ('ALL', 'index')]
+    return [table for table in tables if table not in SMALL_TABLES]
+
+
+def check_query_plans(verbose: bool = False) -> dict:
+    '''
+    Checks that no hot query reads a whole table.
+
+    MySQL picks plans from table statistics and may scan tiny tables even
+    when an index exists, so run the check against realistic data.
+
+    Args:
+        verbose (bool): Print the plan of every statement.
+
+    Returns:
+        dict: The fully scanned tables of each failing query, by query name.
+    '''
+    failures = {}
+    with engine.connect() as connection:
+        for name, run in hot_queries().items():
+            for statement, parameters in capture_statements(connection, run):
+                if verbose:
+                    print(f'{name}: {statement}')
+                    prefix = 'EXPLAIN QUERY PLAN ' if connection.dialect.name == 'sqlite' else 'EXPLAIN '
+                    for row in connection.exec_driver_sql(prefix + statement, parameters):
+                        print(f'    {tuple(row)}')
+                scanned = full_scans(connection, statement, parameters)
+                if scanned:
+                    failures.setdefault(name, []).extend(scanned)
+        connection.rollback()
+    return failures
+
+
+def main() -> None:
+    '''Checks the query plans from the command line, exiting with 1 on a full scan.'''
+    parser = argparse.ArgumentParser(description='Fail if a hot query falls back to a full table scan.')
+    parser.add_argument('--verbose', '-v', action='store_true', help='print every query plan')
+    args = parser.parse_args()
+
+    failures = check_query_plans(args.verbose)
+    for name, tables in failures.items():
+        print(f'{name}: full scan of {", ".join(tables)}')
+    if failures:
+        sys.exit(1)
+    print(f'No full table scans in {len(hot_queries())} queries.')
+
+
+if __name__ == '__main__':
+    main()
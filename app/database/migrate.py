@@ -0,0 +1,94 @@
+import argparse
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, select, String, Table
+from . import migrations
+from .db import engine
+
+# migration modules are named m<version>_<name>.py, e.g. m0002_quote_query_indexes.py
+MIGRATION_NAME = re.compile(r'^m(\d{4})_(\w+)$')
+
+schema_migrations = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+def available_migrations() -> list:
+    '''
+    Lists the migrations shipped with the app, oldest first.
+
+    Returns:
+        list: (version, name, module) tuples.
+    '''
+    found = []
+    for module_info in pkgutil.iter_modules(migrations.__path__):
+        match = MIGRATION_NAME.match(module_info.name)
+        if match:
+            module = importlib.import_module(f'{migrations.__name__}.{module_info.name}')
+            found.append((int(match.group(1)), match.group(2), module))
+    return sorted(found, key=lambda migration: migration[0])
+
+
+def applied_versions(connection) -> set:
+    '''Returns the versions of the migrations already applied to the database.'''
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def upgrade(target: int = None) -> list:
+    '''
+    Applies the pending migrations in version order.
+
+    Each migration is recorded in the schema_migrations table in the same
+    transaction as its changes (MySQL commits DDL statements on its own, so
+    a failed migration there may have to be finished by hand).
+
+    Args:
+        target (int): The last version to apply, defaults to the latest.
+
+    Returns:
+        list: The (version, name) of the migrations applied.
+    '''
+    done = []
+    with engine.connect() as connection:  # one connection, which sees every earlier migration's changes
+        with connection.begin():
+            applied = applied_versions(connection)
+        for version, name, module in available_migrations():
+            if version in applied or (target is not None and version > target):
+                continue
+            with connection.begin():
+                module.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(version=version, name=name))
+            done.append((version, name))
+    return done
+
+
+def main() -> None:
+    '''Applies or lists database migrations from the command line.'''
+    parser = argparse.ArgumentParser(description='Migrate the database schema.')
+    parser.add_argument('command', nargs='?', choices=['upgrade', 'status'], default='upgrade',
+                        help='apply pending migrations (default) or list every migration')
+    parser.add_argument('--to', type=int, help='last version to apply (default: latest)')
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        with engine.begin() as connection:
+            applied = applied_versions(connection)
+        for version, name, _ in available_migrations():
+            print(f'{version:04d} {name}: {"applied" if version in applied else "pending"}')
+        return
+
+    done = upgrade(args.to)
+    for version, name in done:
+        print(f'Applied {version:04d} {name}')
+    if not done:
+        print('The database is up to date.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+from sqlalchemy import BINARY, Boolean, Column, DateTime, ForeignKey, MetaData, String, Table
+
+# The schema as it was before migrations existed, with 16-byte ids. It is
+# spelled out here rather than taken from the models, which keep changing:
+# later columns and tables are added by the migrations that follow.
+metadata = MetaData()
+
+
+def base_columns() -> list:
+    '''Returns the id and timestamp columns every table starts with.'''
+    return [
+        Column('id', BINARY(16), primary_key=True, unique=True, nullable=False),
+        Column('created_at', DateTime, nullable=False),
+        Column('updated_at', DateTime, nullable=False),
+        Column('deleted_at', DateTime, nullable=True),
+    ]
+
+
+categories = Table(
+    'categories', metadata, *base_columns(),
+    Column('category', String(255), nullable=False, unique=True),
+)
+
+countries = Table(
+    'countries', metadata, *base_columns(),
+    Column('country', String(255), nullable=False, unique=True),
+    Column('code', String(255), nullable=False, unique=True),
+)
+
+genders = Table(
+    'genders', metadata, *base_columns(),
+    Column('gender', String(255), nullable=False, unique=True),
+)
+
+roles = Table(
+    'roles', metadata, *base_columns(),
+    Column('role', String(255), nullable=False, unique=True),
+)
+
+users = Table(
+    'users', metadata, *base_columns(),
+    Column('email_address', String(255), nullable=False, unique=True),
+    Column('username', String(255), nullable=False, unique=True),
+    Column('password', String(255), nullable=False),
+    Column('role_id', BINARY(16), ForeignKey('roles.id'), nullable=False),
+    Column('is_verified', Boolean, nullable=False),
+)
+
+profiles = Table(
+    'profiles', metadata, *base_columns(),
+    Column('first_name', String(255), nullable=False),
+    Column('last_name', String(255), nullable=False),
+    Column('telephone', String(255), nullable=False),
+    Column('gender_id', BINARY(16), ForeignKey('genders.id'), nullable=False),
+    Column('country_id', BINARY(16), ForeignKey('countries.id'), nullable=False),
+    Column('user_id', BINARY(16), ForeignKey('users.id'), nullable=False, unique=True),
+)
+
+quotes = Table(
+    'quotes', metadata, *base_columns(),
+    Column('quote', String(255), nullable=False, unique=True),
+    Column('author', String(255), nullable=False),
+    Column('approved', Boolean, nullable=False),
+    Column('user_id', BINARY(16), ForeignKey('users.id'), nullable=False),
+    Column('category_id', BINARY(16), ForeignKey('categories.id'), nullable=False),
+)
+
+
+def upgrade(connection) -> None:
+    '''
+    Creates the tables of the original schema.
+
+    Databases created before migrations existed already have them, and are
+    left untouched.
+    '''
+    metadata.create_all(connection, checkfirst=True)
@@ -0,0 +1,16 @@
+from sqlalchemy import inspect, text
+
+
+def upgrade(connection) -> None:
+    '''
+    Adds the moderation status of quotes.
+
+    Quotes approved before moderation existed are marked approved, the
+    others are left pending for the moderation workers. Databases whose
+    quotes table already has the column, e.g. one converted to binary ids,
+    only get the approved quotes marked.
+    '''
+    columns = {column['name'] for column in inspect(connection).get_columns('quotes')}
+    if 'status' not in columns:
+        connection.execute(text("ALTER TABLE quotes ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'pending'"))
+    connection.execute(text("UPDATE quotes SET status = 'approved' WHERE approved AND status = 'pending'"))
@@ -0,0 +1,27 @@
+from sqlalchemy import BINARY, Column, DateTime, Index, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+outbox = Table(
+    'outbox', metadata,
+    Column('id', BINARY(16), primary_key=True, unique=True, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+    Column('deleted_at', DateTime, nullable=True),
+    Column('subject', String(255), nullable=False),
+    Column('sender', String(255), nullable=True),
+    Column('recipients', Text, nullable=False),
+    Column('html', Text, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('next_attempt_at', DateTime, nullable=False),
+    Column('sent_at', DateTime, nullable=True),
+    Column('last_error', Text, nullable=True),
+    Index('ix_outbox_status', 'status'),
+    Index('ix_outbox_next_attempt_at', 'next_attempt_at'),
+)
+
+
+def upgrade(connection) -> None:
+    '''Creates the table of the emails waiting to be sent by the outbox worker.'''
+    outbox.create(connection, checkfirst=True)
@@ -0,0 +1,166 @@
+import json
+from itertools import islice
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import mysql, sqlite
+from .db import engine
+
+# number of rows looked up and upserted per statement
+BATCH_SIZE = 1000
+
+# bytes read from a JSON file at a time
+READ_SIZE = 64 * 1024
+
+
+def read_json(path: str):
+    '''
+    Streams the objects of a JSON array, or of a JSON Lines file, one at a time.
+
+    The file is decoded chunk by chunk, so it never has to fit in memory.
+
+    Args:
+        path (str): The file to read.
+
+    Yields:
+        dict: Each object of the file.
+    '''
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    with open(path, encoding='utf-8') as f:
+        eof = False
+        while True:
+            # skip the brackets, commas and whitespace between objects
+            while position < len(buffer) and buffer[position] in '[],\r\n\t ':
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer, position = f.read(READ_SIZE), 0
+                eof = not buffer
+                continue
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    raise  # truncated file
+                buffer, position = buffer[position:] + chunk, 0
+                continue
+            if end == len(buffer) and not eof:
+                # a number could continue in the next chunk, read on before trusting it
+                chunk = f.read(READ_SIZE)
+                if chunk:
+                    buffer, position = buffer[position:] + chunk, 0
+                    continue
+                eof = True
+            yield value
+            position = end
+
+
+def upsert_statement(connection, table, columns: list, key: list):
+    '''
+    Builds an INSERT that updates the given columns of rows that already exist.
+
+    Like MySQL's ON DUPLICATE KEY UPDATE, the SQLite statement handles a
+    conflict on any unique column, not only on the key (this needs SQLite
+    3.35 or later).
+    '''
+    if connection.dialect.name == 'mysql':
+        statement = mysql.insert(table)
+        updates = {column: statement.inserted[column] for column in columns} or {key[0]: statement.inserted[key[0]]}
+        return statement.on_duplicate_key_update(updates)
+    statement = sqlite.insert(table)
+    if not columns:
+        return statement.on_conflict_do_nothing()
+    return statement.on_conflict_do_update(set_={column: statement.excluded[column] for column in columns})
+
+
+def upsert_batch(connection, model, rows: list, key: list) -> dict:
+    '''
+    Inserts new rows and updates changed ones in a single statement.
+
+    The existing rows are looked up by key first, so unchanged rows are not
+    written at all and every row can be counted as inserted, updated or skipped.
+    A row whose key is new but which shares another unique column with an
+    existing row updates that row, as the upsert statement does.
+
+    Args:
+        connection (sqlalchemy.engine.Connection): The connection to write with.
+        model: The model of the table.
+        rows (list): Rows with the key columns and the columns to store.
+        key (list): The names of the columns identifying a row, backed by a unique index.
+
+    Returns:
+        dict: The number of rows inserted, updated and skipped.
+    '''
+    table = model.__table__
+    columns = [column for column in rows[0] if column not in key]
+    key_columns = [table.c[column] for column in key]
+    value_columns = [table.c[column] for column in columns]
+    keys = [tuple(row[column] for column in key) for row in rows]
+    condition = key_columns[0].in_([k for k, in keys]) if len(key) == 1 else tuple_(*key_columns).in_(keys)
+    existing = {tuple(row[:len(key)]): tuple(row[len(key):]) for row in connection.execute(
+        select(*key_columns, *value_columns).where(condition))}
+
+    # rows with a new key may still conflict on one of the other unique columns
+    taken = {}  # (column name, value) -> the values of the columns of the existing row
+    new_rows = [row for row, k in zip(rows, keys) if k not in existing]
+    for column in value_columns:
+        if column.unique and new_rows:
+            for row in connection.execute(select(column, *value_columns)
+                                          .where(column.in_([row[column.name] for row in new_rows]))):
+                taken[(column.name, row[0])] = tuple(row[1:])
+
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    changes = []
+    for row, k in zip(rows, keys):
+        current = existing.get(k)
+        if current is None:
+            current = next((taken[(column, row[column])] for column in columns if (column, row[column]) in taken),
+                           None)
+        if current is None:
+            counts['inserted'] += 1
+        elif current != tuple(row[column] for column in columns):
+            counts['updated'] += 1
+        else:
+            counts['skipped'] += 1
+            continue
+        changes.append(row)
+
+    if changes:
+        # ids and timestamps come from the column defaults, which run for every row
+        updated_columns = columns + ['updated_at'] if columns else []
+        connection.execute(upsert_statement(connection, table, updated_columns, key), changes)
+    return counts
+
+
+def seed(model, rows, key, batch_size: int = BATCH_SIZE) -> dict:
+    '''
+    Upserts reference rows in batches, one transaction per batch.
+
+    Running a seed again only writes what changed, and a failing batch does
+    not undo the batches before it.
+
+    Args:
+        model: The model of the table to fill.
+        rows: An iterable of dicts, such as the one returned by read_json.
+        key (str or list): The unique column(s) identifying a row.
+        batch_size (int): The number of rows per statement.
+
+    Returns:
+        dict: The number of rows inserted, updated and skipped.
+    '''
+    key = [key] if isinstance(key, str) else list(key)
+    counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    rows = iter(rows)
+    while True:
+        batch = {}
+        read = 0
+        for read, row in enumerate(islice(rows, batch_size), 1):
+            batch[tuple(row[column] for column in key)] = row  # the last duplicate wins
+        if not batch:
+            return counts
+        counts['skipped'] += read - len(batch)
+        with engine.begin() as connection:
+            for name, count in upsert_batch(connection, model, list(batch.values()), key).items():
+                counts[name] += count
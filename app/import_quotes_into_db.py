@@ -0,0 +1,198 @@
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from multiprocessing import Pool
+from sqlalchemy import insert
+from sqlalchemy.dialects import sqlite
+from tqdm import tqdm
+from cache.versions import VersionStamp
+from models.models import Category, Quote, User
+from models.types import uuid7
+from moderation.sentiment import APPROVAL_THRESHOLD, engine, polarity
+from database.db import session
+
+# number of rows scored and inserted at once
+BATCH_SIZE = 1000
+
+
+def read_rows(path: str, format: str = None):
+    '''
+    Streams quotes from a CSV or JSON Lines file.
+
+    CSV files need a header row. Both formats provide the quote, author and
+    category (name) of each quote.
+
+    Args:
+        path (str): The file to read.
+        format (str): 'csv' or 'jsonl', guessed from the file extension by default.
+
+    Yields:
+        dict: The quote, author and category of each row.
+    '''
+    if format is None:
+        format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = csv.DictReader(f) if format == 'csv' else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            yield {
+                'quote': (row.get('quote') or '').strip(),
+                'author': (row.get('author') or '').strip(),
+                'category': (row.get('category') or '').strip()
+            }
+
+
+def batches(rows, size: int):
+    '''Groups rows into lists of up to size rows.'''
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def score(texts: list) -> list:
+    '''Scores a batch of quotes in a pool process.'''
+    return polarity(texts)
+
+
+def insert_batch(s, rows: list) -> int:
+    '''
+    Inserts a batch of quotes in one executemany, skipping duplicates.
+
+    Rows whose quote is already in the database, including quotes inserted
+    by another writer meanwhile, are skipped by the database itself, so a
+    duplicate never aborts the import. The unique index decides what a
+    duplicate is: with MySQL's default collation, quotes differing only in
+    case or accents are duplicates.
+
+    Args:
+        s (sqlalchemy.orm.Session): The session to insert with.
+        rows (list): Quote rows ready to be inserted.
+
+    Returns:
+        int: The number of quotes inserted.
+    '''
+    connection = s.connection()
+    if connection.dialect.name == 'sqlite':
+        statement = sqlite.insert(Quote.__table__).on_conflict_do_nothing()
+    else:
+        statement = insert(Quote.__table__).prefix_with('IGNORE', dialect='mysql')
+    try:
+        inserted = connection.execute(statement, rows).rowcount
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    return inserted
+
+
+def import_quotes(path: str, username: str, format: str = None, processes: int = None,
+                  batch_size: int = BATCH_SIZE) -> dict:
+    '''
+    Imports quotes from a file, keeping those with a positive sentiment.
+
+    Rows are read lazily and scored in a pool of processes, a few batches
+    ahead of the inserts, so memory use does not grow with the file size.
+
+    Args:
+        path (str): The CSV or JSON Lines file to import.
+        username (str): The user the quotes are attributed to.
+        format (str): 'csv' or 'jsonl', guessed from the file extension by default.
+        processes (int): The number of scoring processes, defaults to the number of CPUs.
+        batch_size (int): The number of rows scored and inserted at once.
+
+    Returns:
+        dict: The number of rows read, inserted, rejected, duplicated and invalid.
+    '''
+    processes = processes or os.cpu_count() or 1
+    counts = {'read': 0, 'inserted': 0, 'rejected': 0, 'duplicates': 0, 'invalid': 0}
+
+    s = session()
+    user = s.query(User).filter_by(username=username).first()
+    if user is None:
+        s.close()
+        raise ValueError(f'User {username} not found')
+    user_id = user.id
+    categories = {category.lower(): id for id, category in s.query(Category.id, Category.category)}
+
+    def insert_scored(batch: list, scores: list) -> None:
+        '''Inserts the approved rows of a scored batch.'''
+        now = datetime.utcnow()
+        seen = set()
+        rows = []
+        for row, polarity_score in zip(batch, scores):
+            if polarity_score <= APPROVAL_THRESHOLD:
+                counts['rejected'] += 1
+            elif row['quote'] in seen:
+                counts['duplicates'] += 1
+            else:
+                seen.add(row['quote'])
+                rows.append({'id': uuid7(), 'quote': row['quote'], 'author': row['author'],
+                             'category_id': row['category_id'], 'user_id': user_id,
+                             'approved': True, 'status': Quote.APPROVED,
+                             'created_at': now, 'updated_at': now})
+        if rows:
+            inserted = insert_batch(s, rows)
+            counts['inserted'] += inserted
+            counts['duplicates'] += len(rows) - inserted
+
+    progress = tqdm(unit=' quotes', smoothing=0.1)
+    try:
+        with Pool(processes, initializer=engine) as pool:  # each process loads the lexicon once
+            in_flight = deque()
+            for batch in batches(read_rows(path, format), batch_size):
+                valid = []
+                for row in batch:
+                    row['category_id'] = categories.get(row['category'].lower())
+                    if row['quote'] and row['author'] and row['category_id']:
+                        valid.append(row)
+                counts['read'] += len(batch)
+                counts['invalid'] += len(batch) - len(valid)
+                in_flight.append((batch, valid, pool.apply_async(score, ([row['quote'] for row in valid],))))
+
+                # keep every process busy without reading the whole file ahead
+                while len(in_flight) > processes * 2 or (in_flight and in_flight[0][2].ready()):
+                    batch, valid, result = in_flight.popleft()
+                    insert_scored(valid, result.get())
+                    progress.update(len(batch))
+                    progress.set_postfix(inserted=counts['inserted'], duplicates=counts['duplicates'])
+
+            while in_flight:
+                batch, valid, result = in_flight.popleft()
+                insert_scored(valid, result.get())
+                progress.update(len(batch))
+                progress.set_postfix(inserted=counts['inserted'], duplicates=counts['duplicates'])
+    finally:
+        progress.close()
+        s.close()
+        if counts['inserted']:
+            VersionStamp('quotes').bump()  # invalidate cached API responses
+
+    return counts
+
+
+def main() -> None:
+    '''Imports quotes from the command line.'''
+    parser = argparse.ArgumentParser(description='Import quotes from a CSV or JSON Lines file.')
+    parser.add_argument('path', help='file with quote, author and category columns')
+    parser.add_argument('--user', required=True, help='username the quotes are attributed to')
+    parser.add_argument('--format', choices=['csv', 'jsonl'],
+                        help='input format (default: guessed from the file extension)')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='number of scoring processes (default: number of CPUs)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='number of rows scored and inserted at once')
+    args = parser.parse_args()
+
+    counts = import_quotes(args.path, args.user, args.format, args.processes, args.batch_size)
+    print(f"Read {counts['read']} quotes: {counts['inserted']} inserted, {counts['rejected']} rejected, "
+          f"{counts['duplicates']} duplicates, {counts['invalid']} invalid")
+
+
+if __name__ == '__main__':
+    main()
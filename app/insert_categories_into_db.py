@@ -1,37 +1,30 @@
+from cache.versions import VersionStamp
 from models.models import Category
-from database.db import session
+from database.seeding import seed
+
+CATEGORIES = [
+    'General',
+    'Success and Achievement',
+    'Self-Confidence and Self-Esteem',
+    'Ledearship and Entrepreneurship',
+    'Happiness and Positivity',
+    'Perseverance and Resilience',
+    'Dreams and Aspirations',
+    'Inspiration from Famous Figures',
+    'Fitness and Health',
+    'Love and Relationships',
+    'Mindfulness and Inner Peace',
+    'Personal Development and Growth',
+    'Creativity and Innovation',
+]
 
 
 # Create categories
 def create_categories():
-    s = session()
-    category_1 = Category('General')
-    category_2 = Category('Success and Achievement')
-    category_3 = Category('Self-Confidence and Self-Esteem')
-    category_4 = Category('Ledearship and Entrepreneurship')
-    category_5 = Category('Happiness and Positivity')
-    category_6 = Category('Perseverance and Resilience')
-    category_7 = Category('Dreams and Aspirations')
-    category_8 = Category('Inspiration from Famous Figures')
-    category_9 = Category('Fitness and Health')
-    category_10 = Category('Love and Relationships')
-    category_11 = Category('Mindfulness and Inner Peace')
-    category_12 = Category('Personal Development and Growth')
-    category_13 = Category('Creativity and Innovation')
-    
-    s.add_all([
-        category_1, category_2, category_3, category_4,
-        category_5, category_6, category_7, category_8,
-        category_9, category_10, category_11, category_12,
-        category_13
-    ])
-    
-    try:
-        s.commit()
-        s.close()
-        print('Added categories successfully!')
-    except Exception as e:
-        print(e)
+    counts = seed(Category, ({'category': category} for category in CATEGORIES), key='category')
+    if counts['inserted'] or counts['updated']:
+        VersionStamp('reference').bump()  # refresh the cached categories of running apps
+    print(f"Categories: {counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped")
 
 
 if __name__ == '__main__':
@@ -1,28 +1,32 @@
-import json
+import argparse
 import os
+from cache.versions import VersionStamp
 from models.models import Country
-from database.db import session
+from database.seeding import BATCH_SIZE, read_json, seed
 
 
-def insert_countries():
-    '''Inserts countries into the database.'''
-    if os.path.exists('countries.json'):
-        with open('countries.json') as f:
-            countries = json.load(f)
-        s = session()
-        for country in countries:
-            c = Country(country=country.get('name'), code=country.get('code'))
-            s.add(c)
-        try:
-            s.commit()
-        except Exception as e:
-            print(e)
-            s.rollback()
-        s.close()
-        print('Countries added successfully!')
-    else:
-        print('countries.json not found!')
+def insert_countries(path: str = 'countries.json', batch_size: int = BATCH_SIZE):
+    '''
+    Inserts countries into the database, updating the names of known country codes.
+
+    Args:
+        path (str): A JSON array (or JSON Lines file) of objects with a name and a code.
+        batch_size (int): The number of countries upserted per statement.
+    '''
+    if not os.path.exists(path):
+        print(f'{path} not found!')
+        return
+    rows = ({'code': country.get('code'), 'country': country.get('name')} for country in read_json(path))
+    counts = seed(Country, rows, key='code', batch_size=batch_size)
+    if counts['inserted'] or counts['updated']:
+        VersionStamp('reference').bump()  # refresh the cached countries of running apps
+    print(f"Countries: {counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped")
 
 
 if __name__ == '__main__':
-    insert_countries()
+    parser = argparse.ArgumentParser(description='Insert or update countries.')
+    parser.add_argument('path', nargs='?', default='countries.json', help='JSON file of countries')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='number of countries upserted per statement')
+    args = parser.parse_args()
+    insert_countries(args.path, args.batch_size)
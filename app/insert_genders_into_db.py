@@ -1,21 +1,16 @@
+from cache.versions import VersionStamp
 from models.models import Gender
-from database.db import session
+from database.seeding import seed
+
+GENDERS = ['Male', 'Female']
 
 
 def insert_genders():
     '''Insert genders into the database.'''
-    male = Gender('Male')
-    female = Gender('Female')
-    
-    s = session()
-    s.add_all([male, female])
-    try:
-        s.commit()
-    except Exception as e:
-        print(e)
-        s.rollback()
-    s.close()
-    print('Genders added successfully!')
+    counts = seed(Gender, ({'gender': gender} for gender in GENDERS), key='gender')
+    if counts['inserted'] or counts['updated']:
+        VersionStamp('reference').bump()  # refresh the cached genders of running apps
+    print(f"Genders: {counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped")
 
 
 if __name__ == '__main__':
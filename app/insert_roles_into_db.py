@@ -1,21 +1,16 @@
-from database.db import session
+from cache.versions import VersionStamp
+from database.seeding import seed
 from models.models import Role
 
+ROLES = ['user', 'admin']
+
 
 # create roles
 def create_roles():
-    s = session()
-    user_role = Role('user')
-    admin_role = Role('admin')
-
-    s.add_all([user_role, admin_role])
-    
-    try:
-        s.commit()
-        s.close()
-        print('Roles added successfully')
-    except Exception as e:
-        print(e)
+    counts = seed(Role, ({'role': role} for role in ROLES), key='role')
+    if counts['inserted'] or counts['updated']:
+        VersionStamp('reference').bump()  # refresh the cached roles of running apps
+    print(f"Roles: {counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped")
 
 
 if __name__ == '__main__':
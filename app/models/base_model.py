@@ -1,7 +1,7 @@
-import uuid
 from datetime import datetime
-from sqlalchemy import Column, DateTime, String
+from sqlalchemy import Column, DateTime
 from sqlalchemy.ext.declarative import declarative_base
+from .types import BinaryUUID, uuid7
 
 Base = declarative_base()
 
@@ -9,7 +9,7 @@ Base = declarative_base()
 class BaseModel:
     '''Base model for all models in the app.'''
 
-    id = Column(String(255), primary_key=True, default=uuid.uuid4,
+    id = Column(BinaryUUID, primary_key=True, default=uuid7,
                          unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow,
                                  nullable=False)
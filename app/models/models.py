@@ -1,7 +1,9 @@
+from datetime import datetime
 from flask_login import UserMixin
-from sqlalchemy import Boolean, Column, ForeignKey, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import relationship
 from .base_model import BaseModel, Base
+from .types import BinaryUUID
 
 
 class Category(Base, BaseModel):
@@ -57,6 +59,41 @@ class Gender(Base, BaseModel):
         return f'Gender("{self.gender}")'
 
 
+class OutboxEmail(Base, BaseModel):
+    '''Model for emails waiting to be sent by the outbox worker.'''
+    __tablename__ = 'outbox'
+
+    # delivery statuses
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    subject = Column(String(255), nullable=False)
+    sender = Column(String(255), nullable=True)
+    recipients = Column(Text, nullable=False)  # comma separated
+    html = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default=PENDING, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    def __init__(self, subject, sender, recipients, html):
+        '''Initialize outbox email.'''
+        self.subject = subject
+        self.sender = sender
+        self.recipients = recipients
+        self.html = html
+
+    def __str__(self):
+        '''String representation of outbox email.'''
+        return f'<OutboxEmail {self.id} {self.subject}>'
+
+    def __repr__(self):
+        '''String representation of outbox email.'''
+        return f'OutboxEmail("{self.subject}", "{self.recipients}")'
+
+
 class Profile(Base, BaseModel):
     '''Model for user profiles.'''
     __tablename__ = 'profiles'
@@ -64,9 +101,9 @@ class Profile(Base, BaseModel):
     first_name = Column(String(255), nullable=False)
     last_name = Column(String(255), nullable=False)
     telephone = Column(String(255), nullable=False)
-    gender_id = Column(String(255), ForeignKey('genders.id'), nullable=False)
-    country_id = Column(String(255), ForeignKey('countries.id'), nullable=False,)
-    user_id = Column(String(255), ForeignKey('users.id'), nullable=False, unique=True)
+    gender_id = Column(BinaryUUID, ForeignKey('genders.id'), nullable=False)
+    country_id = Column(BinaryUUID, ForeignKey('countries.id'), nullable=False,)
+    user_id = Column(BinaryUUID, ForeignKey('users.id'), nullable=False, unique=True)
     gender = relationship('Gender', backref='profiles', lazy=True)
     country = relationship('Country', backref='profiles', lazy=True)
 
@@ -92,14 +129,29 @@ class Quote(Base, BaseModel):
     '''Model for quotes.'''
     __tablename__ = 'quotes'
 
+    # moderation statuses
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    REJECTED = 'rejected'
+
     quote = Column(String(255), nullable=False, unique=True)
     author = Column(String(255), nullable=False)
     approved = Column(Boolean, nullable=False, default=False)
-    user_id = Column(String(255), ForeignKey('users.id'), nullable=False)
-    category_id = Column(String(255), ForeignKey('categories.id'), nullable=False)
+    status = Column(String(20), nullable=False, default=PENDING)
+    user_id = Column(BinaryUUID, ForeignKey('users.id'), nullable=False)
+    category_id = Column(BinaryUUID, ForeignKey('categories.id'), nullable=False)
     user = relationship('User', backref='quotes', lazy=True)
     category = relationship('Category', backref='quotes', lazy=True)
 
+    __table_args__ = (
+        # approved quotes in (created_at, id) order: API pages, exports, search and sampler loads
+        Index('ix_quotes_approved_created_at', 'approved', 'created_at', 'id'),
+        # a user's own quotes
+        Index('ix_quotes_user_id_approved', 'user_id', 'approved'),
+        # pending quotes, oldest first, for the moderation workers
+        Index('ix_quotes_status_created_at', 'status', 'created_at'),
+    )
+
     def __init__(self, category_id, quote, author, user_id):
         '''Initialize quote.'''
         self.quote = quote
@@ -143,7 +195,7 @@ class User(Base, UserMixin, BaseModel):
     email_address = Column(String(255), nullable=False, unique=True)
     username = Column(String(255), nullable=False, unique=True)
     password = Column(String(255), nullable=False)
-    role_id = Column(String(255), ForeignKey('roles.id'), nullable=False)
+    role_id = Column(BinaryUUID, ForeignKey('roles.id'), nullable=False)
     profile = relationship('Profile', backref='user', lazy=True)
     is_verified = Column(Boolean, nullable=False, default=False)
 
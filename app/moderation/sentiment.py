@@ -0,0 +1,292 @@
+import re
+import threading
+import numpy as np
+from textblob.en import sentiment as pattern_sentiment
+from textblob._text import (ABBREVIATIONS, EMOTICONS, EOS, PUNCTUATION, RE_ABBR1,
+                            RE_ABBR2, RE_ABBR3, RE_EMOTICONS, RE_SARCASM, replacements)
+
+# The engine reproduces the polarity computed by TextBlob's default
+# PatternAnalyzer (TextBlob(text).sentiment.polarity). Its tokenizer is a port
+# of textblob._text.find_tokens and the assessment rules of
+# textblob._text.Sentiment.assessments are evaluated for all tokens of a batch
+# at once with NumPy. The floating point operations are performed in the same
+# order, so results are identical to TextBlob's (tolerance 0.0, checked by
+# benchmarks/sentiment.py). Texts containing emoticons, the sarcasm marker
+# "(!)" or a negation right after an "-ly" adverb ("really not good") are rare
+# and follow extra rules, so they are scored by TextBlob itself.
+
+_LEADING_PUNCTUATION = tuple(PUNCTUATION.replace('.', ''))
+_TRAILING_PUNCTUATION = _LEADING_PUNCTUATION + ('.',)
+_CONTRACTIONS = re.compile('(' + '|'.join(replacements) + ')')
+_QUOTES = ('“', '”', '‘', '’', "'", '"')
+_LINEBREAK = re.compile(r'\n{2,}')
+_EMOTICONS = frozenset(emoticon.lower() for emoticons in EMOTICONS.values() for emoticon in emoticons)
+_NEGATIONS = frozenset(pattern_sentiment.negations)
+
+# token flags
+_KNOWN = 1  # in the lexicon
+_MODIFIER = 2  # known adverb modifying the next word ("very")
+_LY = 4  # ends with "ly"
+_NEGATION = 8  # "no", "not", "never"
+_LONG = 16  # unknown word longer than 2 characters, resets the modifier
+_RESETS_NEGATION = 32  # unknown word longer than 1 character, resets the negation
+_EXCLAMATION = 64  # "!", boosts the previous assessment
+_SPECIAL = 128  # emoticon or sarcasm marker
+
+# number of distinct tokens remembered before the token table is reset
+MAX_TOKENS = 500000
+
+# quotes with a polarity above this are approved
+APPROVAL_THRESHOLD = 0
+
+
+class SentimentEngine:
+    '''
+    Batch sentiment scorer with the polarity lexicon preloaded in arrays.
+
+    Every distinct token seen is given an ID in a token table holding its
+    polarity, intensity and flags, so scoring a batch is a handful of array
+    operations over the IDs of all its tokens.
+    '''
+
+    def __init__(self):
+        '''Initialize sentiment engine and load the lexicon.'''
+        self._lexicon = {}
+        for word, tags in pattern_sentiment.items():  # loads en-sentiment.xml
+            polarity, _, intensity = tags[None]
+            flags = _KNOWN | (_MODIFIER if 'RB' in tags else 0)
+            self._lexicon[word] = (polarity, intensity, flags)
+        self._lock = threading.Lock()
+        self._reset_tokens()
+
+    def _reset_tokens(self) -> None:
+        '''Empties the token table.'''
+        self._ids = {}
+        self._polarity = []
+        self._intensity = []
+        self._flags = []
+        self._arrays = None
+
+    def _token_id(self, token: str) -> int:
+        '''Returns the ID of a token, adding it to the token table if needed.'''
+        polarity, intensity, flags = self._lexicon.get(token, (0.0, 1.0, 0))
+        if token.endswith('ly'):
+            flags |= _LY
+        if token in _NEGATIONS:
+            flags |= _NEGATION
+        if not flags & _KNOWN:
+            if len(token) > 2:
+                flags |= _LONG
+            if len(token.strip("'")) > 1 and not flags & _NEGATION:
+                flags |= _RESETS_NEGATION
+            if token == '!':
+                flags |= _EXCLAMATION
+            if token == '(!)' or (not token.isalpha() and len(token) <= 5
+                                  and token not in PUNCTUATION and token in _EMOTICONS):
+                flags |= _SPECIAL
+
+        id = self._ids[token] = len(self._polarity)
+        self._polarity.append(polarity)
+        self._intensity.append(intensity)
+        self._flags.append(flags)
+        self._arrays = None
+        return id
+
+    def tokenize(self, text: str):
+        '''
+        Splits text into lowercase tokens the way TextBlob does.
+
+        Returns:
+            list: The tokens, or None if the text contains an emoticon or
+            sarcasm marker and must be scored by TextBlob.
+        '''
+        if "'" in text:
+            text = _CONTRACTIONS.sub(r' \1', text)
+        for quote in _QUOTES:
+            if quote in text:
+                text = text.replace(quote, f' {quote} ')
+        paragraphs = '\n' in text
+        if paragraphs:
+            text = _LINEBREAK.sub(f' {EOS} ', text.replace('\r\n', '\n'))
+
+        tokens = []
+        for token in text.split():
+            if token.isalpha():
+                tokens.append(token)
+                continue
+            tail = []
+            while token.startswith(_LEADING_PUNCTUATION) and token not in replacements:
+                tokens.append(token[0])
+                token = token[1:]
+            while token.endswith(_TRAILING_PUNCTUATION) and token not in replacements:
+                if token.endswith(_LEADING_PUNCTUATION):
+                    tail.append(token[-1])
+                    token = token[:-1]
+                if token.endswith('...'):
+                    tail.append('...')
+                    token = token[:-3].rstrip('.')
+                if token.endswith('.'):
+                    if token in ABBREVIATIONS or RE_ABBR1.match(token) is not None \
+                            or RE_ABBR2.match(token) is not None or RE_ABBR3.match(token) is not None:
+                        break
+                    tail.append(token[-1])
+                    token = token[:-1]
+            if token != '':
+                tokens.append(token)
+            tokens.extend(reversed(tail))
+
+        joined = ' '.join([token for token in tokens if token != EOS] if paragraphs else tokens)
+        if ('(' in joined and RE_SARCASM.search(joined)) or RE_EMOTICONS.search(joined):
+            return None
+        return joined.lower().split()
+
+    def polarity(self, texts: list) -> np.ndarray:
+        '''
+        Scores the sentiment of each text.
+
+        Args:
+            texts (list): The texts to score.
+
+        Returns:
+            numpy.ndarray: The polarity of each text, from -1.0 (negative) to 1.0 (positive).
+        '''
+        token_lists = [self.tokenize(text) for text in texts]
+        fallback = np.array([tokens is None for tokens in token_lists], dtype=bool)
+        token_lists = [tokens or [] for tokens in token_lists]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.intp, count=len(token_lists))
+
+        with self._lock:  # the token table is shared by every thread
+            if len(self._ids) > MAX_TOKENS:
+                self._reset_tokens()
+            ids = self._ids
+            token_ids = np.fromiter((ids[token] if token in ids else self._token_id(token)
+                                     for tokens in token_lists for token in tokens), dtype=np.intp)
+            tables = self._tables()
+
+        result = self._score(token_ids, lengths, fallback, tables)
+
+        # rare constructions are scored by TextBlob itself
+        for i in np.flatnonzero(fallback):
+            result[i] = pattern_sentiment(texts[i])[0]
+        return result
+
+    def _tables(self) -> tuple:
+        '''Returns the token table as arrays.'''
+        if self._arrays is None:
+            self._arrays = (np.array(self._polarity, dtype=np.float64),
+                            np.array(self._intensity, dtype=np.float64),
+                            np.array(self._flags, dtype=np.int64))
+        return self._arrays
+
+    def _score(self, token_ids: np.ndarray, lengths: np.ndarray, fallback: np.ndarray, tables: tuple) -> np.ndarray:
+        '''
+        Evaluates TextBlob's assessment rules over the tokens of every text at once.
+
+        Args:
+            token_ids (numpy.ndarray): The token IDs of all texts, concatenated.
+            lengths (numpy.ndarray): The number of tokens of each text.
+            fallback (numpy.ndarray): Flags texts to score with TextBlob, updated in place.
+            tables (tuple): The token table as returned by _tables.
+
+        Returns:
+            numpy.ndarray: The polarity of each text (0.0 for fallback texts).
+        '''
+        text_count = len(lengths)
+        result = np.zeros(text_count)
+        if not len(token_ids):
+            return result
+
+        polarity_table, intensity_table, flag_table = tables
+        flags = flag_table[token_ids]
+        position = np.arange(len(token_ids))
+        text = np.repeat(np.arange(text_count), lengths)
+        text_start = (np.cumsum(lengths) - lengths)[text]
+
+        known = (flags & _KNOWN) != 0
+        negation = (flags & _NEGATION) != 0
+
+        def previous(events):
+            '''Position of the last event strictly before each token of the same text, or -1.'''
+            last = np.maximum.accumulate(np.where(events, position, -1))
+            last = np.concatenate(([-1], last[:-1]))
+            return np.where(last >= text_start, last, -1)
+
+        def at(values, positions):
+            '''Values at positions, False where there is no position.'''
+            return (positions >= 0) & values[np.maximum(positions, 0)]
+
+        # a modifier is active from a known adverb until the next known word or long unknown word
+        last_modifier_event = previous(known | ((flags & _LONG) != 0))
+        modified = at(known & ((flags & _MODIFIER) != 0), last_modifier_event)
+        modified_by_ly = modified & at((flags & _LY) != 0, last_modifier_event)
+
+        # a negation is active from a negation word until the next known word or longer unknown word
+        last_negation_event = previous(known | negation | ((flags & _RESETS_NEGATION) != 0))
+        negated = at(negation, last_negation_event)
+
+        # rules we do not vectorize: emoticons, sarcasm and negations after -ly adverbs
+        unknown = ~known
+        negated_after = negation | (negated & ((flags & _RESETS_NEGATION) == 0))
+        special = ((flags & _SPECIAL) != 0) | (unknown & negated_after & modified_by_ly)
+        fallback[text[special]] = True
+
+        # every known word starts an assessment unless a modifier merges it into the previous one
+        words = np.flatnonzero(known)
+        if not len(words):
+            return result
+        word_polarity = polarity_table[token_ids[words]]
+        word_intensity = intensity_table[token_ids[words]]
+        word_negated = negated[words]
+        starts = ~modified[words]
+        assessment = np.cumsum(starts) - 1
+        is_last = np.append(starts[1:], True)
+
+        # the polarity of an assessment is set by its last word, scaled by the previous word's intensity
+        effective_intensity = np.where(word_negated, 1.0 / word_intensity, word_intensity)
+        scaled = np.clip(word_polarity[1:] * effective_intensity[:-1], -1.0, 1.0)
+        assessment_polarity = np.where(starts, word_polarity, np.append(0.0, scaled))[is_last]
+        assessment_negated = np.bincount(assessment, weights=word_negated, minlength=len(assessment_polarity)) > 0
+
+        # exclamation marks boost the assessment of the word before them
+        exclamations = np.flatnonzero((flags & _EXCLAMATION) != 0)
+        if len(exclamations):
+            word_index = np.cumsum(known) - 1
+            previous_word = previous(known)[exclamations]
+            previous_word = word_index[previous_word[previous_word >= 0]]
+            boosted = assessment[previous_word[is_last[previous_word]]]
+            boosts = np.bincount(boosted, minlength=len(assessment_polarity))
+            for count in range(1, boosts.max(initial=0) + 1):
+                selected = boosts >= count
+                assessment_polarity[selected] = np.clip(assessment_polarity[selected] * 1.25, -1.0, 1.0)
+
+        # "not good" is slightly bad, "not bad" is slightly good
+        assessment_polarity = np.where(assessment_negated, assessment_polarity * -0.5, assessment_polarity)
+
+        assessment_text = text[words[is_last]]
+        totals = np.bincount(assessment_text, weights=assessment_polarity, minlength=text_count)
+        counts = np.bincount(assessment_text, minlength=text_count)
+        return totals / np.maximum(counts, 1)
+
+
+_engine = None
+
+
+def engine() -> SentimentEngine:
+    '''Returns the shared sentiment engine, loading the lexicon on first use.'''
+    global _engine
+    if _engine is None:
+        _engine = SentimentEngine()
+    return _engine
+
+
+def polarity(texts: list) -> list:
+    '''
+    Scores the sentiment of each text.
+
+    Args:
+        texts (list): The texts to score.
+
+    Returns:
+        list: The polarity of each text, from -1.0 (negative) to 1.0 (positive).
+    '''
+    return engine().polarity(texts).tolist()
@@ -0,0 +1,134 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+from ..cache.versions import VersionStamp
+from ..database.db import engine, session
+from ..models.models import Quote
+from ..quotes.signals import quote_updated
+from .sentiment import APPROVAL_THRESHOLD, engine as sentiment_engine, polarity
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationWorker:
+    '''
+    Scores pending quotes in batches and approves or rejects them.
+
+    Pending quotes are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so any
+    number of workers, in any number of processes, can drain the queue side by
+    side without scoring the same quote twice.
+    '''
+
+    def __init__(self, batch_size: int = 64, poll_interval: float = 1.0):
+        '''
+        Initialize moderation worker.
+
+        Args:
+            batch_size (int): The maximum number of quotes scored at once.
+            poll_interval (float): Seconds to wait when there is nothing to score.
+        '''
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def run_once(self) -> int:
+        '''
+        Moderates one batch of pending quotes.
+
+        Returns:
+            int: The number of quotes moderated.
+        '''
+        s = session()
+        try:
+            quotes = s.query(Quote).filter(Quote.status == Quote.PENDING)\
+                .order_by(Quote.created_at)\
+                .limit(self.batch_size)\
+                .with_for_update(skip_locked=True)\
+                .all()
+            if not quotes:
+                s.rollback()  # release the transaction
+                return 0
+
+            approved = []
+            for quote, score in zip(quotes, polarity([quote.quote for quote in quotes])):
+                if score > APPROVAL_THRESHOLD:
+                    quote.status = Quote.APPROVED
+                    quote.approved = True
+                    approved.append({'id': quote.id, 'quote': quote.quote, 'author': quote.author,
+                                     'category_id': quote.category_id, 'approved': True})
+                else:
+                    quote.status = Quote.REJECTED
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+        finally:
+            s.close()
+
+        if approved:
+            # the signals only reach this process: let the API processes reload their caches
+            VersionStamp('quotes').bump()
+        for quote in approved:
+            quote_updated.send(quote.pop('id'), **quote)
+
+        logger.info('Moderated %d quotes, approved %d', len(quotes), len(approved))
+        return len(quotes)
+
+    def run(self) -> None:
+        '''Moderates quotes until stop is called.'''
+        while not self._stop.is_set():
+            try:
+                moderated = self.run_once()
+            except Exception:
+                logger.exception('Moderation batch failed')
+                moderated = 0
+
+            # keep going while there is a backlog
+            if moderated < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> threading.Thread:
+        '''Runs the worker on a daemon thread of the current process.'''
+        self._stop.clear()
+        thread = threading.Thread(target=self.run, name='moderation-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        '''Asks the worker to stop after the current batch.'''
+        self._stop.set()
+
+
+def _run_process(batch_size: int, poll_interval: float) -> None:
+    '''Entry point of each worker process.'''
+    engine.dispose(close=False)  # never share the parent's connections
+    ModerationWorker(batch_size, poll_interval).run()
+
+
+def main() -> None:
+    '''Runs a pool of moderation worker processes.'''
+    parser = argparse.ArgumentParser(description='Score and moderate pending quotes.')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: number of CPUs)')
+    parser.add_argument('--batch-size', type=int, default=64,
+                        help='maximum number of quotes scored at once')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='seconds to wait when there is nothing to score')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(processName)s %(message)s')
+
+    sentiment_engine()  # load the lexicon once, the forked processes share it copy-on-write
+    processes = [multiprocessing.Process(target=_run_process, name=f'moderation-{i}',
+                                         args=(args.batch_size, args.poll_interval))
+                 for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
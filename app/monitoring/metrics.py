@@ -0,0 +1,196 @@
+import threading
+import time
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+
+# upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# endpoint label of statements run outside of a request, by workers and background loads
+NO_ENDPOINT = 'none'
+
+
+class Histogram:
+    '''Counts observations in fixed buckets, with their sum, like a Prometheus histogram.'''
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple):
+        '''Initialize histogram.'''
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one counts values above every bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        '''Records a value.'''
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        '''Returns (upper bound, observations at or below it) pairs, ending with +Inf.'''
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class RequestMetrics:
+    '''
+    Per-endpoint request counts, latencies and SQL statements.
+
+    Requests are timed from before_request to after_request. SQL statements
+    are counted and timed by engine events and charged to the request being
+    handled on the same thread, until its response is closed: the statements
+    of a streamed body run after after_request. Recording a request only takes a lock and a
+    few dict updates; formatting happens when /metrics is scraped.
+
+    Metrics are kept per process: with several server processes, each one
+    reports its own.
+    '''
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        '''Initialize request metrics.'''
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._requests = {}  # (endpoint, method, status) -> count
+        self._latency = {}  # endpoint -> Histogram
+        self._sql = {}  # endpoint -> [statements, seconds]
+
+    def init_app(self, app, engine) -> None:
+        '''Records the requests of an app and the statements run on an engine.'''
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _before_request(self) -> None:
+        local = self._local
+        if getattr(local, 'endpoint', None) is not None:
+            self._close_sql()  # the previous response was never closed
+        local.endpoint = request.endpoint or 'unmatched'
+        local.statements = 0
+        local.sql_seconds = 0.0
+        local.started = time.perf_counter()
+
+    def _after_request(self, response):
+        local = self._local
+        started = getattr(local, 'started', None)
+        if started is None:
+            return response  # a before_request function ran before ours and answered
+        duration = time.perf_counter() - started
+        endpoint = local.endpoint
+        key = (endpoint, request.method, response.status_code)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._latency.get(endpoint)
+            if histogram is None:
+                histogram = self._latency[endpoint] = Histogram(self.buckets)
+            histogram.observe(duration)
+        local.started = None
+        response.call_on_close(self._close_sql)
+        return response
+
+    def _close_sql(self) -> None:
+        '''Charges the statements of the current request to its endpoint.'''
+        local = self._local
+        endpoint = getattr(local, 'endpoint', None)
+        if endpoint is None:
+            return
+        with self._lock:
+            sql = self._sql.setdefault(endpoint, [0, 0.0])
+            sql[0] += local.statements
+            sql[1] += local.sql_seconds
+        local.endpoint = None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self._local.statement_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        local = self._local
+        duration = time.perf_counter() - local.statement_started
+        if getattr(local, 'endpoint', None) is not None:
+            local.statements += 1
+            local.sql_seconds += duration
+        else:
+            with self._lock:
+                sql = self._sql.setdefault(NO_ENDPOINT, [0, 0.0])
+                sql[0] += 1
+                sql[1] += duration
+
+    def snapshot(self) -> dict:
+        '''Returns copies of the request counts, latency histograms and SQL totals.'''
+        with self._lock:
+            latency = {endpoint: (histogram.cumulative(), histogram.sum, histogram.count)
+                       for endpoint, histogram in self._latency.items()}
+            return {
+                'requests': dict(self._requests),
+                'latency': latency,
+                'sql': {endpoint: tuple(values) for endpoint, values in self._sql.items()},
+            }
+
+
+def escape(value) -> str:
+    '''Escapes a Prometheus label value.'''
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_bound(bound: float) -> str:
+    '''Formats a histogram bucket bound the way Prometheus clients do.'''
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+def render(snapshot: dict, gauges: dict) -> str:
+    '''
+    Formats metrics in the Prometheus text exposition format.
+
+    Args:
+        snapshot (dict): The result of RequestMetrics.snapshot.
+        gauges (dict): Extra values by metric name, as (help, type, value) tuples.
+
+    Returns:
+        str: The metrics, one sample per line.
+    '''
+    lines = [
+        '# HELP motiquote_http_requests_total Requests handled, by endpoint, method and status.',
+        '# TYPE motiquote_http_requests_total counter',
+    ]
+    for (endpoint, method, status), count in sorted(snapshot['requests'].items()):
+        lines.append(f'motiquote_http_requests_total{{endpoint="{escape(endpoint)}",method="{method}",'
+                     f'status="{status}"}} {count}')
+
+    lines += [
+        '# HELP motiquote_http_request_duration_seconds Time spent handling requests, by endpoint.',
+        '# TYPE motiquote_http_request_duration_seconds histogram',
+    ]
+    for endpoint, (buckets, total, count) in sorted(snapshot['latency'].items()):
+        label = escape(endpoint)
+        for bound, observations in buckets:
+            lines.append(f'motiquote_http_request_duration_seconds_bucket{{endpoint="{label}",'
+                         f'le="{format_bound(bound)}"}} {observations}')
+        lines.append(f'motiquote_http_request_duration_seconds_sum{{endpoint="{label}"}} {total}')
+        lines.append(f'motiquote_http_request_duration_seconds_count{{endpoint="{label}"}} {count}')
+
+    lines += [
+        '# HELP motiquote_sql_statements_total SQL statements run, by endpoint ("none" outside of requests).',
+        '# TYPE motiquote_sql_statements_total counter',
+    ]
+    lines += [f'motiquote_sql_statements_total{{endpoint="{escape(endpoint)}"}} {statements}'
+              for endpoint, (statements, _) in sorted(snapshot['sql'].items())]
+    lines += [
+        '# HELP motiquote_sql_duration_seconds_total Time spent running SQL statements, by endpoint.',
+        '# TYPE motiquote_sql_duration_seconds_total counter',
+    ]
+    lines += [f'motiquote_sql_duration_seconds_total{{endpoint="{escape(endpoint)}"}} {seconds}'
+              for endpoint, (_, seconds) in sorted(snapshot['sql'].items())]
+
+    for name, (help, type, value) in gauges.items():
+        lines += [f'# HELP {name} {help}', f'# TYPE {name} {type}', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
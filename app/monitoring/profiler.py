@@ -0,0 +1,112 @@
+import logging
+import re
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDERS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')  # the expanded values of an IN
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(statement: str) -> str:
+    '''
+    Reduces a statement to its shape, so statements that differ only by their values match.
+
+    Literals become ? and IN lists of any length become (?).
+    '''
+    shape = statement.replace('%s', '?')
+    shape = _STRING.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _PLACEHOLDERS.sub('(?)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    '''Raised, when testing, by a request that ran more statements than SQL_QUERY_BUDGET allows.'''
+
+
+class QueryProfiler:
+    '''
+    Groups the SQL statements of each request to find N+1 queries and slow ones.
+
+    Meant for development: every statement is normalized, which costs more
+    than the counting done for /metrics. Nothing is registered unless
+    SQL_PROFILER is set.
+
+    At the end of a request, a statement shape run N_PLUS_ONE times or more
+    is logged as a likely N+1 query, typically a lazy loaded relationship
+    read in a loop. Statements slower than SQL_SLOW_QUERY_MS are logged as
+    they finish, with the route that ran them. When SQL_QUERY_BUDGET is set,
+    requests running more statements are logged, and fail with
+    QueryBudgetExceeded when the app is testing.
+    '''
+
+    def __init__(self):
+        '''Initialize query profiler.'''
+        self._local = threading.local()
+        self.n_plus_one = 3
+        self.slow_seconds = 0.1
+        self.budget = 0
+
+    def init_app(self, app, engine) -> None:
+        '''Profiles the requests of an app and the statements run on an engine, if SQL_PROFILER is set.'''
+        if not app.config.get('SQL_PROFILER'):
+            return
+        self.n_plus_one = app.config.get('SQL_N_PLUS_ONE', 3)
+        self.slow_seconds = app.config.get('SQL_SLOW_QUERY_MS', 100) / 1000
+        self.budget = app.config.get('SQL_QUERY_BUDGET', 0)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        logger.warning('SQL profiler enabled, not meant for production')
+
+    def _before_request(self) -> None:
+        local = self._local
+        local.route = f'{request.method} {request.path} ({request.endpoint})'
+        local.shapes = {}  # normalized statement -> [count, seconds]
+
+    def _after_request(self, response):
+        local = self._local
+        shapes = getattr(local, 'shapes', None)
+        if shapes is None:
+            return response
+        route = local.route
+        local.route = local.shapes = None
+        statements = sum(count for count, _ in shapes.values())
+        seconds = sum(seconds for _, seconds in shapes.values())
+        logger.info('%s ran %d statements (%d distinct) in %.1fms', route, statements, len(shapes),
+                    seconds * 1000)
+        for shape, (count, seconds) in shapes.items():
+            if count >= self.n_plus_one:
+                logger.warning('Possible N+1 query in %s, run %d times in %.1fms: %s', route, count,
+                               seconds * 1000, shape)
+        if self.budget and statements > self.budget:
+            message = f'{route} ran {statements} statements, over the budget of {self.budget}'
+            if current_app.testing:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self._local.statement_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        local = self._local
+        duration = time.perf_counter() - local.statement_started
+        shapes = getattr(local, 'shapes', None)
+        route = getattr(local, 'route', None) or 'outside of a request'
+        if duration >= self.slow_seconds:
+            logger.warning('Slow query in %s, %.1fms: %s', route, duration * 1000, _SPACES.sub(' ', statement))
+        if shapes is not None:
+            totals = shapes.setdefault(normalize(statement), [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,90 @@
+import hmac
+import os
+from datetime import datetime
+from flask import abort, Blueprint, current_app, render_template, request, Response, send_from_directory
+from flask_login import current_user
+from ..auth.hashing import password_hasher
+from ..cache.reference import reference_data
+from ..cache.users import user_cache
+from ..database.db import pool_stats
+from .metrics import render, request_metrics
+from .sampling import sampling_profiler
+
+monitoring = Blueprint('monitoring', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def gauges() -> dict:
+    '''Collects the connection pool, user cache and password hasher figures.'''
+    pool = pool_stats()
+    users = user_cache.stats()
+    hasher = password_hasher.stats()
+    values = {
+        'motiquote_db_pool_connects_total': ('Database connections opened.', 'counter', pool['connects']),
+        'motiquote_db_pool_checkouts_total': ('Connections taken from the pool.', 'counter', pool['checkouts']),
+        'motiquote_db_pool_max_checked_out': ('Most connections checked out at once.', 'gauge',
+                                              pool['max_checked_out']),
+        'motiquote_user_cache_size': ('Users in the login cache.', 'gauge', users['size']),
+        'motiquote_user_cache_hits_total': ('Users loaded from the login cache.', 'counter', users['hits']),
+        'motiquote_user_cache_misses_total': ('Users loaded from the database.', 'counter', users['misses']),
+        'motiquote_password_hashes_total': ('Passwords hashed or checked.', 'counter', hasher['hashes']),
+        'motiquote_password_hash_seconds_total': ('Time spent in bcrypt.', 'counter', hasher['hash_seconds']),
+        'motiquote_password_hash_wait_seconds_total': ('Time passwords waited for a hashing thread.', 'counter',
+                                                       hasher['wait_seconds']),
+        'motiquote_password_hashes_rejected_total': ('Requests refused because the hasher was busy.', 'counter',
+                                                     hasher['rejected']),
+        'motiquote_password_hashes_pending': ('Passwords being hashed or waiting.', 'gauge', hasher['pending']),
+    }
+    if 'size' in pool:  # pools that keep connections around
+        values.update({
+            'motiquote_db_pool_size': ('Connections kept open by the pool.', 'gauge', pool['size']),
+            'motiquote_db_pool_checked_out': ('Connections in use.', 'gauge', pool['checked_out']),
+            'motiquote_db_pool_checked_in': ('Idle connections.', 'gauge', pool['checked_in']),
+            'motiquote_db_pool_overflow': ('Connections open beyond the pool size.', 'gauge', pool['overflow']),
+        })
+    return values
+
+
+@monitoring.route('/metrics', methods=['GET'], strict_slashes=True)
+def metrics():
+    '''
+    Expose the metrics of this process in the Prometheus text format.
+
+    When METRICS_TOKEN is set, scrapers must send it as a bearer token.
+    '''
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(401)
+    return Response(render(request_metrics.snapshot(), gauges()), content_type=CONTENT_TYPE)
+
+
+def is_admin() -> bool:
+    '''Tells whether the request comes from a logged in admin or carries the PROFILE_TOKEN bearer token.'''
+    token = current_app.config.get('PROFILE_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return current_user.is_authenticated and current_user.role_id == reference_data.role_id('admin')
+
+
+@monitoring.route('/admin/profiles', methods=['GET'], strict_slashes=True)
+def get_profiles():
+    '''List the request profiles saved by the sampling profiler, newest first.'''
+    if not is_admin():
+        abort(404)
+    profiles = []
+    for name in sampling_profiler.profiles():
+        try:
+            stat = os.stat(os.path.join(sampling_profiler.directory, name))
+        except FileNotFoundError:
+            continue  # pruned since it was listed
+        profiles.append({'name': name, 'size': stat.st_size, 'created_at': datetime.utcfromtimestamp(stat.st_mtime)})
+    return render_template('monitoring/profiles.html', profiles=profiles, profiler=sampling_profiler)
+
+
+@monitoring.route('/admin/profiles/<string:name>', methods=['GET'], strict_slashes=True)
+def get_profile(name):
+    '''Download a request profile.'''
+    if not is_admin() or name not in sampling_profiler.profiles():
+        abort(404)
+    return send_from_directory(sampling_profiler.directory, name, as_attachment=True)
@@ -0,0 +1,183 @@
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RoutingException
+from werkzeug.wsgi import ClosingIterator
+from ..cache.versions import STATE_DIR
+
+# seconds between two samples of the stack of a profiled request
+INTERVAL = 0.001
+
+# extension of the files written in each format
+FORMATS = {'collapsed': '.collapsed', 'pstats': '.prof'}
+
+# characters kept from an endpoint in a file name
+_UNSAFE = re.compile(r'[^\w.]+')
+
+
+class StackSampler(threading.Thread):
+    '''
+    Samples the stack of a thread at a fixed interval.
+
+    The samples are counted in the collapsed format read by flame graph
+    tools: one line per distinct stack, its frames from the outermost
+    separated by semicolons, followed by the number of samples.
+    '''
+
+    def __init__(self, thread_id: int, interval: float = INTERVAL):
+        '''Initialize stack sampler.'''
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        '''Samples until stopped.'''
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if frames and not self._stopped.is_set():  # not the request waiting for this thread
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def stop(self) -> None:
+        '''Stops sampling and waits for the last sample.'''
+        self._stopped.set()
+        self.join()
+
+    def write(self, path: str) -> None:
+        '''Writes the samples in the collapsed format.'''
+        with open(path, 'w') as f:
+            f.writelines(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    '''
+    Profiles a sample of the requests of the apps it is initialized with.
+
+    A request is profiled when it is drawn at PROFILE_SAMPLE_RATE or when it
+    carries an X-Profile header matching PROFILE_TOKEN. Its profile is
+    written to PROFILE_DIR, named after the time, the endpoint and the
+    latency of the request, either as collapsed stacks sampled every
+    millisecond (for flame graphs) or as cProfile statistics (pstats). Only
+    the PROFILE_KEEP newest profiles are kept.
+
+    Each app gets its own ProfiledApp middleware, which shares these settings
+    and the saved profiles. It is not installed when neither a rate nor a
+    token is set; otherwise a request that is not sampled costs a random draw.
+    '''
+
+    def __init__(self):
+        '''Initialize sampling profiler.'''
+        self.rate = 0.0
+        self.token = None
+        self.format = 'collapsed'
+        self.directory = os.path.join(STATE_DIR, 'profiles')
+        self.keep = 200
+
+    def init_app(self, app) -> None:
+        '''Wraps the WSGI application of an app, if a sample rate or a token is set.'''
+        self.rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        self.token = app.config.get('PROFILE_TOKEN')
+        self.format = app.config.get('PROFILE_FORMAT') or self.format
+        self.directory = app.config.get('PROFILE_DIR') or self.directory
+        self.keep = app.config.get('PROFILE_KEEP', self.keep)
+        if self.format not in FORMATS:
+            raise ValueError(f'PROFILE_FORMAT must be one of {", ".join(FORMATS)}, not {self.format}')
+        if self.rate or self.token:
+            # one middleware per app, so apps created later do not take over this one
+            app.wsgi_app = ProfiledApp(self, app.wsgi_app, app.url_map)
+
+    def _sampled(self, environ) -> bool:
+        if self.rate and random.random() < self.rate:
+            return True
+        header = environ.get('HTTP_X_PROFILE')
+        return bool(self.token and header and hmac.compare_digest(header, self.token))
+
+    def _profile(self, wsgi_app, url_map, environ, start_response):
+        started = time.perf_counter()
+        if self.format == 'pstats':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                return wsgi_app(environ, start_response)  # Python 3.12+ runs one cProfile at a time
+        else:
+            profiler = StackSampler(threading.get_ident())
+            profiler.start()
+
+        def finish():
+            if self.format == 'pstats':
+                profiler.disable()
+            else:
+                profiler.stop()
+            self._save(profiler, url_map, environ, time.perf_counter() - started)
+
+        try:
+            iterable = wsgi_app(environ, start_response)
+        except BaseException:
+            finish()
+            raise
+        # the body may be streamed, so the profile ends when the server closes the response
+        return ClosingIterator(iterable, finish)
+
+    def _save(self, profiler, url_map, environ, duration: float) -> None:
+        try:
+            # matched again, Flask has dropped its request by the time the response is closed
+            endpoint = url_map.bind_to_environ(environ).match()[0]
+        except (HTTPException, RoutingException):
+            endpoint = 'unmatched'
+        name = (f'{datetime.utcnow():%Y%m%dT%H%M%S.%f}-{_UNSAFE.sub("_", endpoint)}'
+                f'-{duration * 1000:.0f}ms{FORMATS[self.format]}')
+        os.makedirs(self.directory, exist_ok=True)
+        if self.format == 'pstats':
+            profiler.dump_stats(os.path.join(self.directory, name))
+        else:
+            profiler.write(os.path.join(self.directory, name))
+        self._prune()
+
+    def _prune(self) -> None:
+        names = self.profiles()
+        for name in names[self.keep:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # removed by another process
+
+    def profiles(self) -> list:
+        '''Returns the names of the saved profiles, newest first.'''
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted((name for name in names if name.endswith(tuple(FORMATS.values()))), reverse=True)
+
+
+class ProfiledApp:
+    '''The WSGI application of an app, with a sample of its requests profiled.'''
+
+    def __init__(self, profiler: SamplingProfiler, wsgi_app, url_map):
+        '''Initialize profiled app.'''
+        self.profiler = profiler
+        self.wsgi_app = wsgi_app
+        self.url_map = url_map
+
+    def __call__(self, environ, start_response):
+        if self.profiler._sampled(environ):
+            return self.profiler._profile(self.wsgi_app, self.url_map, environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+sampling_profiler = SamplingProfiler()
@@ -0,0 +1,32 @@
+from flask import current_app
+from flask_mail import Message
+from ..database.db import session
+from ..models.models import OutboxEmail
+
+
+def queue_email(message: Message) -> str:
+    '''
+    Stores an email in the outbox instead of sending it during the request.
+
+    The outbox worker delivers it shortly after, retrying if the SMTP server
+    is unavailable.
+
+    Args:
+        message (flask_mail.Message): The rendered email.
+
+    Returns:
+        str: The id of the outbox entry.
+    '''
+    s = session()
+    sender = message.sender or current_app.config.get('MAIL_DEFAULT_SENDER')
+    email = OutboxEmail(subject=message.subject, sender=sender,
+                        recipients=','.join(message.recipients), html=message.html)
+    s.add(email)
+    s.commit()
+    return email.id
+
+
+def to_message(email: OutboxEmail) -> Message:
+    '''Rebuilds the Flask-Mail message of an outbox entry.'''
+    return Message(email.subject, recipients=email.recipients.split(','),
+                   sender=email.sender, html=email.html)
@@ -0,0 +1,224 @@
+import argparse
+import logging
+import random
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from ..database.db import session
+from ..models.models import OutboxEmail
+from .emails import to_message
+
+logger = logging.getLogger(__name__)
+
+# an email is given up on after this many failed attempts
+MAX_ATTEMPTS = 8
+
+# delay before the first retry, doubled after every failed attempt
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 3600
+
+# seconds after which emails claimed by a worker that died before recording their outcome are sent again
+CLAIM_TIMEOUT = 600
+
+
+def retry_delay(attempts: int) -> timedelta:
+    '''Returns the exponential backoff, with jitter, after a number of failed attempts.'''
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+class OutboxWorker:
+    '''
+    Delivers the emails queued in the outbox in batches.
+
+    Due emails are claimed with SELECT ... FOR UPDATE SKIP LOCKED, by moving
+    their next attempt CLAIM_TIMEOUT seconds ahead, and the claim is
+    committed before they are sent over a single SMTP connection per batch,
+    so no lock or database connection is held while talking to the SMTP
+    server. Failed emails are retried with exponential backoff until
+    MAX_ATTEMPTS is reached.
+    '''
+
+    def __init__(self, app, mail, batch_size: int = 50, poll_interval: float = 2.0):
+        '''
+        Initialize outbox worker.
+
+        Args:
+            app (flask.Flask): The app whose mail settings are used.
+            mail (flask_mail.Mail): The mail extension of the app.
+            batch_size (int): The maximum number of emails sent per connection.
+            poll_interval (float): Seconds to wait when there is nothing to send.
+        '''
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def run_once(self) -> int:
+        '''
+        Sends one batch of due emails.
+
+        Returns:
+            int: The number of emails claimed.
+        '''
+        # the app context removes the session of this thread when it ends, so it spans the whole batch
+        with self.app.app_context():
+            s = session()
+            try:
+                messages = self._claim(s)
+                if not messages:
+                    return 0
+                outcomes = self._send(messages)
+                self._record(s, [email_id for email_id, _ in messages], outcomes)
+            finally:
+                s.close()
+
+        sent = sum(1 for outcome in outcomes.values() if outcome is None)
+        logger.info('Sent %d of %d emails', sent, len(messages))
+        return len(messages)
+
+    def _claim(self, s) -> list:
+        '''Claims a batch of due emails and returns their (id, message), committing the claim.'''
+        now = datetime.utcnow()
+        try:
+            emails = s.query(OutboxEmail)\
+                .filter(OutboxEmail.status == OutboxEmail.PENDING, OutboxEmail.next_attempt_at <= now)\
+                .order_by(OutboxEmail.next_attempt_at)\
+                .limit(self.batch_size)\
+                .with_for_update(skip_locked=True)\
+                .all()
+            messages = []
+            for email in emails:
+                email.next_attempt_at = now + timedelta(seconds=CLAIM_TIMEOUT)
+                try:
+                    messages.append((email.id, to_message(email)))
+                except Exception as e:  # a malformed email must not block the ones behind it
+                    messages.append((email.id, e))
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+        return messages
+
+    def _send(self, messages: list) -> dict:
+        '''
+        Sends claimed emails over one SMTP connection.
+
+        Returns:
+            dict: The outcome of each email by id: None when it was sent,
+            (error, permanent) when it failed. Emails left out were not
+            attempted, the connection could not be opened or was lost.
+        '''
+        outcomes = {}
+        lost = None  # the error that ended the connection, closing it may raise another one
+        try:
+            with self.mail.connect() as connection:  # one connection for the whole batch
+                for email_id, message in messages:
+                    if isinstance(message, Exception):
+                        outcomes[email_id] = (message, True)
+                        continue
+                    try:
+                        connection.send(message)
+                    except smtplib.SMTPRecipientsRefused as e:
+                        outcomes[email_id] = (e, True)
+                    except smtplib.SMTPServerDisconnected as e:
+                        outcomes[email_id] = (e, False)
+                        lost = e
+                        raise
+                    except smtplib.SMTPException as e:  # refused by the server, this email only
+                        outcomes[email_id] = (e, False)
+                    except OSError as e:  # the connection is gone, the next emails would fail as well
+                        outcomes[email_id] = (e, False)
+                        lost = e
+                        raise
+                    except Exception as e:
+                        outcomes[email_id] = (e, True)
+                    else:
+                        outcomes[email_id] = None
+        except OSError as e:  # could not connect, or the connection dropped (SMTPException included)
+            logger.warning('SMTP connection failed after %d of %d emails: %s', len(outcomes), len(messages), lost or e)
+        return outcomes
+
+    def _record(self, s, email_ids: list, outcomes: dict) -> None:
+        '''Records the outcome of each claimed email, releasing the ones that were not attempted.'''
+        now = datetime.utcnow()
+        # retry at once after a lost connection, later when none could be opened
+        released_at = now if outcomes else now + retry_delay(1)
+        try:
+            for email in s.query(OutboxEmail).filter(OutboxEmail.id.in_(email_ids)):
+                if email.id not in outcomes:
+                    email.next_attempt_at = released_at  # not attempted, no attempt counted
+                elif outcomes[email.id] is None:
+                    email.status = OutboxEmail.SENT
+                    email.sent_at = now
+                    email.attempts += 1
+                else:
+                    error, permanent = outcomes[email.id]
+                    self._failed(email, error, permanent)
+            s.commit()
+        except Exception:
+            s.rollback()
+            raise
+
+    def _failed(self, email: OutboxEmail, error: Exception, permanent: bool = False) -> None:
+        '''Schedules a retry of an email, or gives up on it.'''
+        email.attempts += 1
+        email.last_error = str(error)[:1000]
+        if permanent or email.attempts >= MAX_ATTEMPTS:
+            email.status = OutboxEmail.FAILED
+            logger.error('Giving up on email %s: %s', email.id, error)
+        else:
+            email.next_attempt_at = datetime.utcnow() + retry_delay(email.attempts)
+            logger.warning('Email %s failed, retrying later: %s', email.id, error)
+
+    def run(self) -> None:
+        '''Sends emails until stop is called.'''
+        while not self._stop.is_set():
+            try:
+                attempted = self.run_once()
+            except Exception:
+                logger.exception('Outbox batch failed')
+                attempted = 0
+
+            # keep going while there is a backlog
+            if attempted < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self) -> threading.Thread:
+        '''Runs the worker on a daemon thread of the current process.'''
+        self._stop.clear()
+        thread = threading.Thread(target=self.run, name='outbox-worker', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        '''Asks the worker to stop after the current batch.'''
+        self._stop.set()
+
+
+def main() -> None:
+    '''Runs the outbox worker.'''
+    parser = argparse.ArgumentParser(description='Deliver the emails queued in the outbox.')
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help='maximum number of emails sent per SMTP connection')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds to wait when there is nothing to send')
+    parser.add_argument('--once', action='store_true',
+                        help='send the emails that are due and exit')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    from app import create_app, mail
+
+    worker = OutboxWorker(create_app(), mail, args.batch_size, args.poll_interval)
+    if args.once:
+        while worker.run_once() == args.batch_size:
+            pass
+    else:
+        worker.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import SelectField, StringField, SubmitField
 from wtforms.validators import DataRequired
-from ..models.models import Country, Gender
-from ..database.db import session
+from ..cache.reference import reference_data
 
 class ProfileForm(FlaskForm):
     '''
@@ -16,14 +15,15 @@ class ProfileForm(FlaskForm):
         telephone (StringField): A field for user's telephone.
         submit (SubmitField): A field for submitting the form.
     '''
-    s = session()
     first_name = StringField('First Name', validators=[DataRequired()])
     last_name = StringField('Last Name', validators=[DataRequired()])
-    gender_id = SelectField('Gender', validators=[DataRequired()], choices=[
-        (g.id, g.gender) for g in s.query(Gender).order_by(Gender.gender).all() if g
-    ])
-    country_id = SelectField('Country', validators=[DataRequired()], choices=[
-        (c.id, c.country) for c in s.query(Country).order_by(Country.country).all() if c
-    ])
+    gender_id = SelectField('Gender', validators=[DataRequired()])
+    country_id = SelectField('Country', validators=[DataRequired()])
     telephone = StringField('Telephone', validators=[DataRequired()])
     submit = SubmitField('Submit')
+
+    def __init__(self, *args, **kwargs):
+        '''Initialize form with the current genders and countries.'''
+        super().__init__(*args, **kwargs)
+        self.gender_id.choices = reference_data.genders()
+        self.country_id.choices = reference_data.countries()
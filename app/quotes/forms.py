@@ -1,8 +1,7 @@
 from flask_wtf import FlaskForm
 from wtforms import SelectField, StringField, SubmitField
 from wtforms.validators import DataRequired
-from ..models.models import Category
-from ..database.db import session
+from ..cache.reference import reference_data
 
 
 class QuoteForm(FlaskForm):
@@ -15,10 +14,13 @@ class QuoteForm(FlaskForm):
         category (StringField): The category of the quote.
         submit (SubmitField): The submit button.
     """
-    # create database session
-    s = session()
     id = StringField('Id')
     quote = StringField('Quote', validators=[DataRequired()])
     author = StringField('Author', validators=[DataRequired()])
-    category_id = SelectField('Category', validators=[DataRequired()], choices=[(cat.id, cat.category) for cat in s.query(Category).all()])
+    category_id = SelectField('Category', validators=[DataRequired()])
     submit = SubmitField('Submit')
+
+    def __init__(self, *args, **kwargs):
+        '''Initialize form with the current categories.'''
+        super().__init__(*args, **kwargs)
+        self.category_id.choices = reference_data.categories()
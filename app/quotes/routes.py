@@ -4,7 +4,7 @@ from sqlalchemy.exc import IntegrityError
 from ..models.models import Quote, Category
 from ..database.db import session
 from .forms import QuoteForm
-from textblob import TextBlob
+from .signals import quote_created, quote_deleted, quote_updated
 
 quotes = Blueprint('quotes', __name__, url_prefix='/quotes')
 
@@ -23,8 +23,8 @@ def get_quotes():
     
     quote_form = QuoteForm()
 
-    # query database for all quotes associated to current user
-    quotes = [quote for quote in s.query(Quote).filter_by(user_id=current_user.id).join(Category).all() if quote.approved]
+    # query database for all quotes associated to current user, including those awaiting moderation
+    quotes = s.query(Quote).filter_by(user_id=current_user.id).join(Category).all()
  
     # if there are not quotes for the user set quotes to False
     if not quotes:
@@ -65,12 +65,37 @@ def get_quote(id):
     return redirect(url_for('quotes.get_quotes'))
 
 
+@quotes.route('/<string:id>/status', methods=['GET'], strict_slashes=True)
+@login_required
+def get_quote_status(id):
+    '''
+    Retrieves the moderation status of a quote by the current user.
+
+    Args:
+        id (str): The id of the quote.
+
+    Returns:
+        A JSON object with the status ('pending', 'approved' or 'rejected') of the quote.
+    '''
+    s = session()
+    quote = s.query(Quote.id, Quote.status, Quote.approved).filter_by(id=id, user_id=current_user.id).first()
+    s.close()
+
+    if not quote:
+        return jsonify({'error': 'The quote does not exist!'}), 404
+
+    return jsonify({'id': quote.id, 'status': quote.status, 'approved': quote.approved})
+
+
 @quotes.route('/add', methods=['POST'], strict_slashes=True)
 @login_required
 def create_quote():
     '''
-    Creates a new post
-    
+    Creates a new post.
+
+    The quote is stored as pending and approved or rejected by the moderation
+    workers once its sentiment has been scored.
+
     Returns:
         str: The rendered HTML template for the quote page
     '''
@@ -85,25 +110,16 @@ def create_quote():
 
     s.add(new_quote)  # add new quote to database
 
-    blob = TextBlob(new_quote.quote)  # create TextBlob object for sentiment analysis
-
-    sentiment = blob.sentiment.polarity
-
-    # check if sentiment is positive
-    if sentiment > 0:
-        new_quote.approved = True
-
-        try:
-            s.commit()  # commit changes to database
-            flash(message='Your quote has been added successfully', category='success')
-        except IntegrityError:
-            s.rollback()
-            flash(message='The quote already exists!', category='error')
-
-        s.close()  # close database session
+    try:
+        s.commit()  # commit changes to database
+        quote_created.send(new_quote.id, quote=new_quote.quote, author=new_quote.author,
+                           category_id=new_quote.category_id, approved=new_quote.approved)
+        flash(message='Your quote has been submitted and will be published once it has been reviewed', category='success')
+    except IntegrityError:
+        s.rollback()
+        flash(message='The quote already exists!', category='error')
 
-    else:
-        flash(message='Please check your quote again. It seems to be too negative.', category='error')
+    s.close()  # close database session
 
     return redirect(url_for('quotes.get_quotes'))
 
@@ -133,12 +149,15 @@ def update_quote(id):
     }
 
     # check if quote exists
-    if quote.first():
+    existing_quote = quote.first()
+    if existing_quote:
+        approved = existing_quote.approved
         quote.update(quote_update_values, synchronize_session=False)  # update quote
 
         # try to commit changes to database
         try:
             s.commit()
+            quote_updated.send(id, approved=approved, **quote_update_values)
             flash(message='Your quote has been updated successfully', category='success')
         except IntegrityError:
             s.rollback()
@@ -166,9 +185,12 @@ def delete_quote(id):
     quote = s.query(Quote).filter_by(id=id)  # query database for quote by id
 
     # check if quote exists
-    if quote.first():
+    existing_quote = quote.first()
+    if existing_quote:
+        approved = existing_quote.approved
         quote.delete(synchronize_session=False)  # delete quote
         s.commit()  # commit changes to database
+        quote_deleted.send(id, approved=approved)
         flash(message='Your quote has been deleted successfully', category='success')
     else:
         flash(message='The quote does not exist!', category='error')
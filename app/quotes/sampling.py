@@ -0,0 +1,254 @@
+import hashlib
+import random
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from sqlalchemy import select
+from ..cache.versions import VersionStamp
+from ..database.db import engine
+from ..models.models import Quote
+from .signals import quote_created, quote_deleted, quote_updated
+
+# number of rows fetched per round-trip when loading the ids
+LOAD_BATCH_SIZE = 10000
+
+
+class IdPool:
+    '''
+    A set of ids supporting constant-time insertion, removal and random choice.
+
+    Ids are kept in a list with their position in a dict. Removing an id
+    moves the last id into its slot, so the list never has holes.
+    '''
+
+    def __init__(self):
+        '''Initialize id pool.'''
+        self._ids = []
+        self._positions = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, id) -> bool:
+        return id in self._positions
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, id) -> None:
+        '''Adds an id if it is not in the pool yet.'''
+        if id not in self._positions:
+            self._positions[id] = len(self._ids)
+            self._ids.append(id)
+
+    def remove(self, id) -> None:
+        '''Removes an id if it is in the pool.'''
+        position = self._positions.pop(id, None)
+        if position is None:
+            return
+        last = self._ids.pop()
+        if position < len(self._ids):
+            self._ids[position] = last
+            self._positions[last] = position
+
+    def choice(self, rng=random):
+        '''Returns a random id, or None if the pool is empty.'''
+        if not self._ids:
+            return None
+        return self._ids[rng.randrange(len(self._ids))]
+
+
+def daily_score(day: date, id: str) -> bytes:
+    '''Ranks ids for a given day; the id with the highest score is the quote of the day.'''
+    return hashlib.blake2b(f'{day.isoformat()}:{id}'.encode('utf-8'), digest_size=8).digest()
+
+
+def created_before(id: str, moment: datetime) -> bool:
+    '''
+    Tells whether a quote was created before a moment, from its id.
+
+    Ids are time-ordered UUIDs starting with their creation time in
+    milliseconds; ids of other versions were converted from before them.
+    '''
+    value = uuid.UUID(id)
+    return value.version != 7 or value.int >> 80 < moment.timestamp() * 1000
+
+
+class QuoteSampler:
+    '''
+    Random and daily picks among approved quotes, optionally within a category.
+
+    The ids of approved quotes are kept in memory, per category and overall,
+    and updated from the signals sent by the quotes blueprint, so picking a
+    random quote never touches the database. Changes made by other processes
+    bump the shared quotes version; the ids are then reloaded in the
+    background, at most once every `resync_interval` seconds.
+    '''
+
+    def __init__(self, resync_interval: int = 30):
+        '''Initialize quote sampler.'''
+        self.resync_interval = resync_interval
+        self._version = VersionStamp('quotes')
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._all = None
+        self._categories = {}  # category id -> IdPool
+        self._category_of = {}  # quote id -> category id
+        self._loaded_version = None
+        self._loaded_at = None
+        self._pending = None  # changes received while the ids are being reloaded
+        self._today = (None, None)  # (day, quote id)
+
+    def init_app(self, app) -> None:
+        '''Configures the sampler for an app and subscribes it to quote changes.'''
+        self.resync_interval = app.config.get('QUOTE_SAMPLER_RESYNC_INTERVAL', self.resync_interval)
+        quote_created.connect(self._on_quote_saved, weak=False)
+        quote_updated.connect(self._on_quote_saved, weak=False)
+        quote_deleted.connect(self._on_quote_deleted, weak=False)
+
+    def load(self, first: bool = False) -> None:
+        '''
+        Reloads the ids of every approved quote from the database.
+
+        Args:
+            first (bool): Wait for a load running on another thread instead of
+                returning, and skip loading if that load did the job.
+        '''
+        if not self._loading.acquire(blocking=first):
+            return  # a reload is already running
+        try:
+            if first and self._all is not None:
+                return
+            version, _ = self._version.current()
+            with self._lock:
+                self._pending = []
+
+            all_ids = IdPool()
+            categories = {}
+            category_of = {}
+            query = select(Quote.id, Quote.category_id).where(Quote.approved.is_(True))
+            with engine.connect() as connection:  # a connection of its own, outside of any request
+                result = connection.execution_options(yield_per=LOAD_BATCH_SIZE).execute(query)
+                for quote_id, category_id in result:
+                    quote_id = str(quote_id)
+                    all_ids.add(quote_id)
+                    categories.setdefault(category_id, IdPool()).add(quote_id)
+                    category_of[quote_id] = category_id
+
+            with self._lock:
+                self._all, self._categories, self._category_of = all_ids, categories, category_of
+                for apply, args in self._pending:  # replay the changes received meanwhile
+                    apply(*args)
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+            self._loading.release()
+
+    def _ensure_loaded(self) -> None:
+        '''Loads the ids on first use and reloads them when another process changed quotes.'''
+        if self._all is None:
+            self.load(first=True)
+            return
+
+        if time.monotonic() - self._loaded_at < self.resync_interval or self._loading.locked():
+            return
+        version, _ = self._version.current()
+        if version != self._loaded_version:
+            threading.Thread(target=self.load, name='quote-sampler-load', daemon=True).start()
+
+    def random(self, category_id: str = None):
+        '''
+        Picks a random approved quote.
+
+        Args:
+            category_id (str): Only pick among quotes of this category.
+
+        Returns:
+            str: The id of the quote, or None if there is none.
+        '''
+        self._ensure_loaded()
+        with self._lock:
+            pool = self._all if category_id is None else self._categories.get(category_id)
+            return pool.choice() if pool else None
+
+    def today(self, day: date = None):
+        '''
+        Picks the quote of the day.
+
+        The pick is made among the quotes created before the day began, and
+        only depends on the day and those quotes, not on the order the ids
+        were loaded in nor on quotes added during the day, so processes
+        agree on it whenever they loaded their ids. It is kept until it is
+        deleted or the day is over.
+
+        Args:
+            day (date): The day, defaults to today (UTC).
+
+        Returns:
+            str: The id of the quote, or None if there is none.
+        '''
+        day = day or utc_today()
+        self._ensure_loaded()
+        with self._lock:
+            picked_day, quote_id = self._today
+            if picked_day == day and quote_id in self._all:
+                return quote_id
+            ids = list(self._all)
+
+        midnight = datetime.combine(day, datetime.min.time(), timezone.utc)
+        # only when every quote is newer than the day, e.g. on a new database
+        candidates = [id for id in ids if created_before(id, midnight)] or ids
+        # rendezvous hashing: the pick only depends on the day and the set of ids
+        quote_id = max(candidates, key=lambda id: daily_score(day, id), default=None)
+        with self._lock:
+            self._today = (day, quote_id)
+        return quote_id
+
+    def discard(self, quote_id: str) -> None:
+        '''Forgets a quote that turned out to be missing from the database.'''
+        with self._lock:
+            self._remove(quote_id)
+
+    def _add(self, quote_id: str, category_id: str) -> None:
+        self._remove(quote_id)
+        self._all.add(quote_id)
+        self._categories.setdefault(category_id, IdPool()).add(quote_id)
+        self._category_of[quote_id] = category_id
+
+    def _remove(self, quote_id: str) -> None:
+        if self._all is None:
+            return
+        self._all.remove(quote_id)
+        category_id = self._category_of.pop(quote_id, None)
+        if category_id in self._categories:
+            self._categories[category_id].remove(quote_id)
+
+    def _apply(self, apply, *args) -> None:
+        '''Applies a change and records it if the ids are being reloaded.'''
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((apply, args))
+            if self._all is not None:
+                apply(*args)
+
+    def _on_quote_saved(self, quote_id, **quote) -> None:
+        '''Adds a created or updated quote, or drops it if it is not approved.'''
+        if quote.get('approved'):
+            self._apply(self._add, str(quote_id), quote.get('category_id'))
+        else:
+            self._apply(self._remove, str(quote_id))
+
+    def _on_quote_deleted(self, quote_id, **quote) -> None:
+        '''Drops a deleted quote.'''
+        self._apply(self._remove, str(quote_id))
+
+
+def utc_today() -> date:
+    '''Returns the current UTC date.'''
+    return datetime.now(timezone.utc).date()
+
+
+quote_sampler = QuoteSampler()
@@ -0,0 +1,10 @@
+from blinker import Namespace
+
+# Signals sent by the quotes blueprint once a change has been committed.
+# Receivers are called with the quote ID as sender and the quote's fields as
+# keyword arguments (quote_deleted only sends whether the quote was approved).
+_signals = Namespace()
+
+quote_created = _signals.signal('quote-created')
+quote_updated = _signals.signal('quote-updated')
+quote_deleted = _signals.signal('quote-deleted')
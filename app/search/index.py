@@ -0,0 +1,308 @@
+import math
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from threading import RLock
+
+_TOKEN_RE = re.compile(r'[^\W_]+')
+_ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+STOPWORDS = frozenset('''
+a about above after again against all am an and any are as at be because been
+before being below between both but by can did do does doing down during each
+few for from further had has have having he her here hers herself him himself
+his how i if in into is it its itself just me more most my myself no nor not of
+off on once only or other our ours ourselves out over own same she should so
+some such than that the their theirs them themselves then there these they this
+those through to too under until up very was we were what when where which while
+who whom why will with you your yours yourself yourselves
+'''.split())
+
+# weights applied to a term depending on how it matched the query token
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def normalize(text: str) -> str:
+    '''Lowercases text and strips accents and apostrophes.'''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.lower().replace("'", '').replace('’', '')
+
+
+def tokenize(text: str, stopwords=STOPWORDS) -> list:
+    '''Splits text into normalized tokens, dropping stopwords.'''
+    return [token for token in _TOKEN_RE.findall(normalize(text or '')) if token not in stopwords]
+
+
+def edits(term: str) -> set:
+    '''Returns every string one insertion, deletion, substitution or transposition away from term.'''
+    splits = [(term[:i], term[i:]) for i in range(len(term) + 1)]
+    deletes = [left + right[1:] for left, right in splits if right]
+    transposes = [left + right[1] + right[0] + right[2:] for left, right in splits if len(right) > 1]
+    replaces = [left + char + right[1:] for left, right in splits if right for char in _ALPHABET]
+    inserts = [left + char + right for left, right in splits for char in _ALPHABET]
+    return set(deletes + transposes + replaces + inserts)
+
+
+class InvertedIndex:
+    '''
+    An in-memory inverted index with prefix and typo-tolerant matching.
+
+    Documents are identified by an arbitrary hashable key and hold one text
+    per field. Each field keeps, per term, a posting list of internal document
+    numbers and term frequencies in compact arrays. Removed documents are
+    tombstoned and purged from the posting lists once they make up half of
+    the index, so updates stay cheap.
+
+    Queries use AND semantics: every query token must match a document, either
+    exactly, as a prefix of a longer term or within one edit. Matches are ranked
+    with BM25, weighted by field boost and match type. The posting lists are
+    scored with NumPy, through views of their arrays; NumPy is only imported
+    on the first search.
+    '''
+
+    def __init__(self, fields: dict, stopwords=STOPWORDS, min_prefix_length: int = 2,
+                 min_fuzzy_length: int = 4, max_expansions: int = 50):
+        '''
+        Initialize index.
+
+        Args:
+            fields (dict): Maps each field name to its boost.
+            stopwords (frozenset): Tokens that are never indexed.
+            min_prefix_length (int): Shortest query token expanded as a prefix.
+            min_fuzzy_length (int): Shortest query token matched with a typo.
+            max_expansions (int): Maximum number of terms a prefix expands to.
+        '''
+        self.fields = dict(fields)
+        self.stopwords = stopwords
+        self.min_prefix_length = min_prefix_length
+        self.min_fuzzy_length = min_fuzzy_length
+        self.max_expansions = max_expansions
+        self._lock = RLock()
+        self._postings = {field: {} for field in self.fields}  # term -> (docs, frequencies)
+        self._lengths = {field: array('I') for field in self.fields}
+        self._total_lengths = {field: 0 for field in self.fields}
+        self._keys = []  # document number -> key, None once removed
+        self._live = bytearray()  # document number -> 1, 0 once removed
+        self._documents = {}  # key -> document number
+        self._vocabulary = []  # sorted list of every indexed term
+        self._terms = set()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, key) -> bool:
+        return key in self._documents
+
+    def add(self, key, **texts) -> None:
+        '''
+        Adds or replaces a document.
+
+        Args:
+            key: The identifier of the document.
+            **texts: The text of each field of the document.
+        '''
+        with self._lock:
+            self._remove(key)
+            number = len(self._keys)
+            self._keys.append(key)
+            self._live.append(1)
+            self._documents[key] = number
+
+            for field in self.fields:
+                tokens = tokenize(texts.get(field), self.stopwords)
+                self._lengths[field].append(len(tokens))
+                self._total_lengths[field] += len(tokens)
+
+                frequencies = {}
+                for token in tokens:
+                    frequencies[token] = frequencies.get(token, 0) + 1
+
+                postings = self._postings[field]
+                for term, frequency in frequencies.items():
+                    posting = postings.get(term)
+                    if posting is None:
+                        posting = postings[term] = (array('I'), array('B'))
+                        if term not in self._terms:
+                            self._terms.add(term)
+                            insort(self._vocabulary, term)
+                    posting[0].append(number)
+                    posting[1].append(min(frequency, 255))
+
+            self._maybe_compact()
+
+    def remove(self, key) -> None:
+        '''Removes a document if it is indexed.'''
+        with self._lock:
+            self._remove(key)
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        '''Compacts the index once half of it is tombstones.'''
+        if len(self._keys) > 64 and len(self._documents) < len(self._keys) // 2:
+            self._compact()
+
+    def _remove(self, key) -> None:
+        number = self._documents.pop(key, None)
+        if number is None:
+            return
+        self._keys[number] = None
+        self._live[number] = 0
+        for field in self.fields:
+            self._total_lengths[field] -= self._lengths[field][number]
+
+    def _compact(self) -> None:
+        '''Renumbers live documents and drops tombstoned postings.'''
+        renumbered = {}
+        keys = []
+        lengths = {field: array('I') for field in self.fields}
+        for number, key in enumerate(self._keys):
+            if key is None:
+                continue
+            renumbered[number] = len(keys)
+            keys.append(key)
+            for field in self.fields:
+                lengths[field].append(self._lengths[field][number])
+
+        terms = set()
+        for field, postings in self._postings.items():
+            compacted = {}
+            for term, (documents, frequencies) in postings.items():
+                live = [(renumbered[number], frequency)
+                        for number, frequency in zip(documents, frequencies) if number in renumbered]
+                if live:
+                    compacted[term] = (array('I', (number for number, _ in live)),
+                                       array('B', (frequency for _, frequency in live)))
+                    terms.add(term)
+            self._postings[field] = compacted
+
+        self._keys = keys
+        self._live = bytearray(b'\x01' * len(keys))
+        self._documents = {key: number for number, key in enumerate(keys)}
+        self._lengths = lengths
+        self._terms = terms
+        self._vocabulary = sorted(terms)
+
+    def _expand(self, token: str) -> list:
+        '''Returns the indexed terms matching a query token with their weights.'''
+        expansions = {}
+        if token in self._terms:
+            expansions[token] = EXACT_WEIGHT
+
+        if len(token) >= self.min_prefix_length:
+            position = bisect_left(self._vocabulary, token)
+            count = 0
+            while position < len(self._vocabulary) and count < self.max_expansions:
+                term = self._vocabulary[position]
+                if not term.startswith(token):
+                    break
+                expansions.setdefault(term, PREFIX_WEIGHT)
+                position += 1
+                count += 1
+
+        if len(token) >= self.min_fuzzy_length:
+            for term in edits(token) & self._terms:
+                expansions.setdefault(term, FUZZY_WEIGHT)
+
+        return list(expansions.items())
+
+    def _score_token(self, token: str, fields):
+        '''
+        Scores every live document matching a single query token.
+
+        Returns:
+            numpy.ndarray: The score of each document number, 0 for documents that do not match.
+        '''
+        import numpy as np
+
+        # views of the arrays of the index: they must not outlive the lock, as
+        # an array cannot grow while it is viewed
+        scores = np.zeros(len(self._keys))
+        document_count = len(self._documents)
+        for term, weight in self._expand(token):
+            for field in fields:
+                posting = self._postings[field].get(term)
+                if not posting:
+                    continue
+                documents, frequencies = posting
+                # tombstones are counted until compaction, so cap the document frequency
+                frequency_of_term = min(len(documents), document_count)
+                idf = math.log(1 + (document_count - frequency_of_term + 0.5) / (frequency_of_term + 0.5))
+                boost = weight * self.fields[field] * idf
+                lengths = np.frombuffer(self._lengths[field], dtype=np.uintc)
+                average_length = self._total_lengths[field] / document_count or 1
+
+                documents = np.frombuffer(documents, dtype=np.uintc)
+                frequencies = np.frombuffer(frequencies, dtype=np.ubyte).astype(float)
+                # K1 * (1 - B + B * length / average_length) + frequency, computed in place
+                norm = lengths[documents] * B
+                norm /= average_length
+                norm += 1 - B
+                norm *= K1
+                norm += frequencies
+                term_scores = boost * frequencies
+                term_scores *= K1 + 1
+                term_scores /= norm
+                # a term occurs once per posting list, so the documents are distinct
+                scores[documents] = np.maximum(scores[documents], term_scores)
+
+        if document_count < len(self._keys):
+            scores[np.frombuffer(self._live, dtype=np.bool_) == 0] = 0  # removed documents never match
+        return scores
+
+    def search(self, query: str, fields=None, limit: int = 20) -> list:
+        '''
+        Searches the index.
+
+        Args:
+            query (str): The text to search for.
+            fields (list): The fields to search, defaults to every field.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: (key, score) tuples, best match first.
+        '''
+        tokens = list(dict.fromkeys(tokenize(query, self.stopwords)))
+        if not tokens:
+            return []
+        fields = [field for field in (fields or self.fields) if field in self.fields]
+
+        import numpy as np
+
+        with self._lock:
+            if not self._documents:
+                return []
+            per_token = []
+            for token in tokens:
+                scores = self._score_token(token, fields)
+                numbers = np.flatnonzero(scores)
+                if not len(numbers):
+                    return []
+                per_token.append((scores, numbers))
+
+            # start from the rarest token, and add the scores in that order
+            per_token.sort(key=lambda item: len(item[1]))
+            scores, numbers = per_token[0]
+            totals = scores[numbers]
+            for scores, _ in per_token[1:]:
+                token_scores = scores[numbers]
+                matched = token_scores > 0
+                numbers, totals = numbers[matched], totals[matched] + token_scores[matched]
+                if not len(numbers):
+                    return []
+
+            if 0 < limit < len(numbers):
+                # keep the best matches, with every tie of the last one
+                threshold = np.partition(totals, len(totals) - limit)[len(totals) - limit]
+                best = totals >= threshold
+                numbers, totals = numbers[best], totals[best]
+            order = np.lexsort((numbers, -totals))[:max(limit, 0)]
+            return [(self._keys[number], score)
+                    for number, score in zip(numbers[order].tolist(), totals[order].tolist())]
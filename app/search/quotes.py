@@ -0,0 +1,125 @@
+import threading
+import time
+from ..database.db import session
+from ..models.models import Quote
+from ..quotes.signals import quote_created, quote_deleted, quote_updated
+from .index import InvertedIndex
+
+# boosts applied to matches in each field
+FIELDS = {'quote': 1.0, 'author': 2.0}
+
+# number of rows fetched per round-trip when rebuilding the index
+REBUILD_BATCH_SIZE = 10000
+
+
+class QuoteSearch:
+    '''
+    Search over approved quotes and their authors.
+
+    The index is built from the database in bulk on the first search of each
+    process (or ahead of it, with rebuild_in_background) and kept up to date
+    from the signals sent by the quotes blueprint. Other processes serving the
+    app do not receive those signals, so the index is also rebuilt in the
+    background once it is older than `max_age` seconds.
+    '''
+
+    def __init__(self, max_age: int = 300):
+        '''Initialize quote search.'''
+        self.max_age = max_age
+        self._index = InvertedIndex(FIELDS)
+        self._built_at = None
+        self._ready = threading.Event()
+        self._rebuilding = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = None  # changes received while a rebuild is running
+
+    def init_app(self, app) -> None:
+        '''Configures search for an app and subscribes it to quote changes.'''
+        self.max_age = app.config.get('SEARCH_INDEX_MAX_AGE', self.max_age)
+        quote_created.connect(self._on_quote_saved, weak=False)
+        quote_updated.connect(self._on_quote_saved, weak=False)
+        quote_deleted.connect(self._on_quote_deleted, weak=False)
+
+    def rebuild(self) -> None:
+        '''Rebuilds the index from every approved quote in the database.'''
+        if not self._rebuilding.acquire(blocking=False):
+            return  # a rebuild is already running
+        try:
+            with self._lock:
+                self._pending = []
+
+            index = InvertedIndex(FIELDS)
+            s = session()
+            try:
+                rows = s.query(Quote.id, Quote.quote, Quote.author)\
+                    .filter(Quote.approved.is_(True))\
+                    .yield_per(REBUILD_BATCH_SIZE)
+                for row in rows:
+                    index.add(str(row.id), quote=row.quote, author=row.author)
+            finally:
+                s.close()
+
+            # replay the changes committed while the rows were being read
+            with self._lock:
+                for apply, args in self._pending:
+                    apply(index, *args)
+                self._index = index
+                self._built_at = time.monotonic()
+            self._ready.set()
+        finally:
+            with self._lock:
+                self._pending = None
+            self._rebuilding.release()
+
+    def rebuild_in_background(self) -> threading.Thread:
+        '''Rebuilds the index on a daemon thread.'''
+        thread = threading.Thread(target=self.rebuild, name='quote-search-rebuild', daemon=True)
+        thread.start()
+        return thread
+
+    def search(self, query: str, fields=None, limit: int = 20, timeout: float = None) -> list:
+        '''
+        Searches approved quotes.
+
+        Args:
+            query (str): The text to search for.
+            fields (list): 'quote' and/or 'author', defaults to both.
+            limit (int): The maximum number of results.
+            timeout (float): How long to wait for the first build of the index.
+
+        Returns:
+            list: The IDs of the matching quotes, best match first.
+        '''
+        if self._built_at is None and not self._rebuilding.locked():
+            self.rebuild_in_background()  # first search of this process
+        if not self._ready.wait(timeout):
+            raise TimeoutError('Search index is not ready')
+        stale = self.max_age and time.monotonic() - self._built_at > self.max_age
+        if stale and not self._rebuilding.locked():
+            self.rebuild_in_background()
+        return [key for key, _ in self._index.search(query, fields=fields, limit=limit)]
+
+    def _apply(self, apply, *args) -> None:
+        '''Applies a change to the index and records it if a rebuild is running.'''
+        with self._lock:
+            apply(self._index, *args)
+            if self._pending is not None:
+                self._pending.append((apply, args))
+
+    def _on_quote_saved(self, quote_id, **quote) -> None:
+        '''Indexes a created or updated quote, or drops it if it is not approved.'''
+        if quote.get('approved'):
+            self._apply(_add, str(quote_id), quote.get('quote'), quote.get('author'))
+        else:
+            self._apply(InvertedIndex.remove, str(quote_id))
+
+    def _on_quote_deleted(self, quote_id, **quote) -> None:
+        '''Drops a deleted quote from the index.'''
+        self._apply(InvertedIndex.remove, str(quote_id))
+
+
+def _add(index: InvertedIndex, quote_id: str, quote: str, author: str) -> None:
+    index.add(quote_id, quote=quote, author=author)
+
+
+quote_search = QuoteSearch()
@@ -33,6 +33,9 @@
     const editProfileGender = document.querySelector('.gender-id');
     const editProfileCountry = document.querySelector('.country-id');
 
+    // moderation status of pending quotes
+    const pendingQuotes = document.querySelectorAll('.moderation-status.pending');
+
     const body = document.querySelector('body');
 
 
@@ -133,6 +136,22 @@
         editProfileForm.querySelector('.btn-primary').disabled = false;  // enable submit btn
     }
 
+    // Function to poll the moderation status of a pending quote and reload once it is reviewed
+    async function pollQuoteStatus(status, attempts = 20) {
+        const response = await fetch(status.dataset.statusUrl);
+        if (response.ok) {
+            const quote = await response.json();
+            if (quote.status !== 'pending') {
+                window.location.reload();
+                return;
+            }
+        }
+
+        if (attempts > 1) {
+            setTimeout(() => pollQuoteStatus(status, attempts - 1), 3000);
+        }
+    }
+
 // All event listeners
     if (flashMessageCloseBtn) {
         flashMessageCloseBtn.addEventListener('click', closeFlashMessage);
@@ -163,6 +182,9 @@
         editQuoteBtn.addEventListener('click', editQuote);
     }
 
+    // poll pending quotes until they are reviewed
+    pendingQuotes.forEach(status => pollQuoteStatus(status));
+
     // event listener for edit profile btn
     if (editProfileBtn) {
         editProfileBtn.addEventListener('click', e => {
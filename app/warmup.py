@@ -0,0 +1,59 @@
+import gc
+import logging
+from .cache.reference import reference_data
+from .database.db import engine, remove_session
+from .quotes.sampling import quote_sampler
+from .search.quotes import quote_search
+
+logger = logging.getLogger(__name__)
+
+
+def load_shared_data(app) -> None:
+    '''
+    Loads what every worker needs before the server forks them.
+
+    Compiles the templates, imports NumPy, which scores searches, and loads
+    the reference tables, the ids used for random picks and the search index,
+    so forked workers start with them and share their memory copy-on-write
+    until they reload them. The connections used are closed afterwards: a
+    connection must never be shared between processes. When the database is
+    not reachable, workers load the data on first use instead.
+
+    Args:
+        app (flask.Flask): The app whose templates are compiled.
+    '''
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    import numpy  # noqa: F401
+    try:
+        reference_data.categories()
+        quote_sampler.load(first=True)
+        quote_search.rebuild()
+    except Exception:
+        logger.exception('Could not load the shared data, workers will load it on first use')
+    finally:
+        remove_session()
+        engine.dispose()
+    gc.freeze()  # the collector would otherwise write to, and so copy, every inherited object
+
+
+def open_connections(count: int) -> int:
+    '''
+    Opens up to count connections in the pool of the current process.
+
+    Called in each worker before it accepts requests, so the first requests
+    do not wait for connections to be opened.
+
+    Returns:
+        int: The number of connections opened.
+    '''
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    except Exception:
+        logger.exception('Could not open the database connections, requests will open them')
+    finally:
+        for connection in connections:
+            connection.close()  # back to the pool, still open
+    return len(connections)
@@ -0,0 +1,211 @@
+'''
+Synthetic data generator for load tests.
+
+Fills the configured database (DATABASE_URL) with users, profiles and
+quotes drawn from skewed, realistic distributions: a few prolific writers
+and popular authors, uneven categories, and a configurable share of
+approved, rejected and pending quotes. Every generated user can log in
+with PASSWORD. Rows are added to what is already there, so a database can
+be grown step by step.
+
+Usage:
+    python -m benchmarks.datagen --quotes 1000000 --users 100000
+'''
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select
+from app.auth.utils import hash_password
+from app.cache.versions import VersionStamp
+from app.database.db import engine
+from app.database.migrate import upgrade
+from app.database.seeding import read_json, seed
+from app.models.models import Category, Country, Gender, Profile, Quote, Role, User
+from app.models.types import uuid7
+from .sentiment import QUOTES
+
+PASSWORD = 'Password1'
+
+# rows per INSERT statement
+BATCH_SIZE = 10000
+
+# one generated user in UNVERIFIED_EVERY has not verified their email address
+UNVERIFIED_EVERY = 10
+
+CATEGORIES = ['General', 'Success and Achievement', 'Self-Confidence and Self-Esteem',
+              'Ledearship and Entrepreneurship', 'Happiness and Positivity', 'Perseverance and Resilience',
+              'Dreams and Aspirations', 'Inspiration from Famous Figures', 'Fitness and Health',
+              'Love and Relationships', 'Mindfulness and Inner Peace', 'Personal Development and Growth',
+              'Creativity and Innovation']
+
+FIRST_NAMES = ['Albert', 'Maya', 'Nelson', 'Marie', 'Mark', 'Ada', 'Kwame', 'Frida', 'Lao', 'Rumi',
+               'Oprah', 'Steve', 'Helen', 'Martin', 'Amelia', 'Seneca', 'Toni', 'Walt', 'Confucius', 'Yaa']
+LAST_NAMES = ['Einstein', 'Angelou', 'Mandela', 'Curie', 'Twain', 'Lovelace', 'Nkrumah', 'Kahlo', 'Tzu',
+              'Winfrey', 'Jobs', 'Keller', 'King', 'Earhart', 'Morrison', 'Disney', 'Asantewaa', 'Aurelius']
+WORDS = ['today', 'always', 'courage', 'dream', 'hope', 'work', 'love', 'grow', 'patience', 'kindness',
+         'begin', 'rise', 'learn', 'light', 'journey', 'strength', 'joy', 'focus', 'faith', 'change']
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> list:
+    '''Returns cumulative weights giving rank r a share proportional to 1 / r^exponent.'''
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def seed_reference_data() -> dict:
+    '''Inserts the reference rows the generated data points to, returning their ids.'''
+    countries_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'app', 'countries.json')
+    seed(Category, ({'category': category} for category in CATEGORIES), key='category')
+    seed(Country, ({'code': country['code'], 'country': country['name']} for country in read_json(countries_path)),
+         key='code')
+    seed(Gender, [{'gender': 'Male'}, {'gender': 'Female'}], key='gender')
+    seed(Role, [{'role': 'user'}, {'role': 'admin'}], key='role')
+    with engine.connect() as connection:
+        return {
+            'categories': list(connection.execute(select(Category.id)).scalars()),
+            'countries': list(connection.execute(select(Country.id)).scalars()),
+            'genders': list(connection.execute(select(Gender.id)).scalars()),
+            'role': connection.execute(select(Role.id).where(Role.role == 'user')).scalar(),
+        }
+
+
+def insert_batches(model, rows, batch_size: int = BATCH_SIZE) -> int:
+    '''Inserts rows in batches of one executemany each, returning the number inserted.'''
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            with engine.begin() as connection:
+                connection.execute(insert(model), batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        with engine.begin() as connection:
+            connection.execute(insert(model), batch)
+        count += len(batch)
+    return count
+
+
+def is_verified(number: int) -> bool:
+    '''Tells whether the generated user user<number> has verified their email address, and can log in.'''
+    return number % UNVERIFIED_EVERY != UNVERIFIED_EVERY - 1
+
+
+def generate_users(count: int, start: int, reference: dict, rng: random.Random,
+                   profile_ratio: float = 0.3) -> list:
+    '''
+    Inserts users user<start> to user<start + count - 1>, with profiles for some of them.
+
+    Returns:
+        list: The ids of the new users.
+    '''
+    password = hash_password(PASSWORD)  # hashed once, bcrypt is far too slow to run per user
+    ids = [uuid7() for _ in range(count)]
+    country_weights = zipf_weights(len(reference['countries']), 0.8)
+    now = datetime.utcnow()
+    insert_batches(User, ({
+        'id': id, 'email_address': f'user{start + i}@example.com', 'username': f'user{start + i}',
+        'password': password, 'role_id': reference['role'], 'is_verified': is_verified(start + i),
+        'created_at': now, 'updated_at': now,
+    } for i, id in enumerate(ids)))
+    insert_batches(Profile, ({
+        'user_id': id, 'first_name': rng.choice(FIRST_NAMES), 'last_name': rng.choice(LAST_NAMES),
+        'telephone': f'+1555{rng.randrange(10 ** 7):07d}', 'gender_id': rng.choice(reference['genders']),
+        'country_id': rng.choices(reference['countries'], cum_weights=country_weights)[0],
+        'created_at': now, 'updated_at': now,
+    } for id in ids if rng.random() < profile_ratio))
+    return ids
+
+
+def generate_quotes(count: int, start: int, user_ids: list, reference: dict, rng: random.Random,
+                    approved_ratio: float = 0.85, rejected_ratio: float = 0.1) -> int:
+    '''
+    Inserts count quotes, numbered from start so their texts stay unique.
+
+    Writers and authors follow Zipf distributions and categories are
+    skewed towards the first ones; creation times spread over two years.
+
+    Returns:
+        int: The number of quotes inserted.
+    '''
+    authors = [f'{first} {last}' for first in FIRST_NAMES for last in LAST_NAMES]
+    rng.shuffle(authors)
+    author_weights = zipf_weights(len(authors))
+    writer_weights = zipf_weights(len(user_ids), 0.9)
+    category_weights = zipf_weights(len(reference['categories']), 0.7)
+    end = datetime.utcnow()
+    step = timedelta(days=730) / max(count, 1)
+
+    def rows():
+        for i in range(count):
+            draw = rng.random()
+            status = Quote.APPROVED if draw < approved_ratio \
+                else Quote.REJECTED if draw < approved_ratio + rejected_ratio else Quote.PENDING
+            created_at = end - step * (count - i)
+            yield {
+                'id': uuid7(),
+                'quote': f'{rng.choice(QUOTES)} {" ".join(rng.sample(WORDS, 3))} #{start + i}',
+                'author': rng.choices(authors, cum_weights=author_weights)[0],
+                'category_id': rng.choices(reference['categories'], cum_weights=category_weights)[0],
+                'user_id': rng.choices(user_ids, cum_weights=writer_weights)[0],
+                'approved': status == Quote.APPROVED, 'status': status,
+                'created_at': created_at, 'updated_at': created_at,
+            }
+
+    return insert_batches(Quote, rows())
+
+
+def grow(quotes: int, users: int, random_seed: int = 0, approved_ratio: float = 0.85) -> dict:
+    '''
+    Grows the database to at least the given numbers of quotes and users.
+
+    Args:
+        quotes (int): The number of quotes wanted.
+        users (int): The number of users wanted.
+        random_seed (int): The random seed, for reproducible data.
+        approved_ratio (float): The share of new quotes that are approved.
+
+    Returns:
+        dict: The numbers of quotes and users added.
+    '''
+    upgrade()
+    rng = random.Random(random_seed)
+    reference = seed_reference_data()
+    with engine.connect() as connection:
+        user_count = connection.execute(select(func.count()).select_from(User)).scalar()
+        quote_count = connection.execute(select(func.count()).select_from(Quote)).scalar()
+
+    if users > user_count:
+        generate_users(users - user_count, user_count, reference, rng)
+    with engine.connect() as connection:
+        user_ids = list(connection.execute(select(User.id).order_by(User.id)).scalars())
+
+    added = 0
+    if quotes > quote_count:
+        added = generate_quotes(quotes - quote_count, quote_count, user_ids, reference, rng, approved_ratio)
+        VersionStamp('quotes').bump()  # let running processes reload their ids and responses
+    return {'quotes': added, 'users': max(users - user_count, 0)}
+
+
+def main() -> None:
+    '''Generates data from the command line.'''
+    parser = argparse.ArgumentParser(description='Fill the database with synthetic users and quotes.')
+    parser.add_argument('--quotes', type=int, default=100000, help='number of quotes wanted in total')
+    parser.add_argument('--users', type=int, default=10000, help='number of users wanted in total')
+    parser.add_argument('--approved', type=float, default=0.85, help='share of approved quotes')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    added = grow(args.quotes, args.users, args.seed, args.approved)
+    print(f"Added {added['users']} users and {added['quotes']} quotes "
+          f'in {time.perf_counter() - started:.1f}s (password of every user: {PASSWORD})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+'''
+Micro-benchmarks of the request hot paths.
+
+Runs against a throwaway SQLite database and the Flask test client, so it
+needs no network and never touches the configured database. Each case is
+timed a number of times and its median, 95th percentile and mean are
+reported; the results can be saved as JSON and compared with an earlier
+run, failing when a median got slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.hotpaths [--sizes 1000 100000] [--output results.json]
+                                  [--compare baseline.json --threshold 0.25]
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# never touch the configured database or the version files of running servers
+WORK_DIR = tempfile.mkdtemp(prefix='motiquote-benchmark-')
+os.environ['DATABASE_URL'] = f'sqlite:///{WORK_DIR}/benchmark.db'
+os.environ['STATE_DIR'] = WORK_DIR
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from sqlalchemy import delete, insert, select
+from app import create_app
+from app.auth.forms import LoginForm, RegisterForm
+from app.auth.routes import load_user
+from app.auth.utils import hash_password
+from app.cache.users import load_snapshot
+from app.database.db import engine, remove_session
+from app.database.migrate import upgrade
+from app.database.seeding import seed
+from app.models.models import Category, Quote, Role, User
+from app.models.types import uuid7
+from app.moderation.worker import ModerationWorker
+from app.quotes.forms import QuoteForm
+from app.search.quotes import quote_search
+from .sentiment import generate
+
+PASSWORD = 'Benchmark1'
+
+CATEGORIES = ['General', 'Success and Achievement', 'Happiness and Positivity', 'Dreams and Aspirations']
+
+# default relative slowdown of a median tolerated by --compare
+THRESHOLD = 0.25
+
+app = create_app()
+
+
+def measure(function, runs: int, warmup: int = 3, setup=None) -> dict:
+    '''
+    Times a function.
+
+    Args:
+        function: The function to call, without arguments.
+        runs (int): The number of timed calls.
+        warmup (int): The number of calls made before timing.
+        setup: A function called, untimed, before each call.
+
+    Returns:
+        dict: The median, 95th percentile and mean duration in microseconds, and the number of runs.
+    '''
+    durations = []
+    for run in range(warmup + runs):
+        if setup:
+            setup()
+        start = time.perf_counter_ns()
+        function()
+        if run >= warmup:
+            durations.append((time.perf_counter_ns() - start) / 1000)
+    durations.sort()
+    return {
+        'median_us': round(statistics.median(durations), 1),
+        'p95_us': round(durations[min(int(len(durations) * 0.95), len(durations) - 1)], 1),
+        'mean_us': round(statistics.fmean(durations), 1),
+        'runs': runs,
+    }
+
+
+def expect(response, status: int):
+    '''Fails the benchmark when a request did not do what it is meant to measure.'''
+    if response.status_code != status:
+        raise SystemExit(f'{response.request.method} {response.request.path} returned '
+                         f'{response.status_code} instead of {status}')
+    return response
+
+
+def set_up() -> dict:
+    '''Creates the schema, the reference rows and a verified user.'''
+    upgrade()
+    seed(Category, ({'category': category} for category in CATEGORIES), key='category')
+    seed(Role, [{'role': 'user'}], key='role')
+    with engine.begin() as connection:
+        user_id = uuid7()
+        role_id = connection.execute(Role.__table__.select().where(Role.role == 'user')).first().id
+        connection.execute(insert(User), [{
+            'id': user_id, 'email_address': 'benchmark@example.com', 'username': 'benchmark',
+            'password': hash_password(PASSWORD), 'role_id': role_id, 'is_verified': True,
+        }])
+        category_ids = [row.id for row in connection.execute(Category.__table__.select())]
+    return {'user_id': user_id, 'category_ids': category_ids}
+
+
+def fill_quotes(size: int, user_id: str, category_ids: list) -> None:
+    '''Replaces the quotes with size approved quotes spread over the categories.'''
+    rng = random.Random(size)
+    started = datetime(2023, 1, 1)
+    rows = [{'id': uuid7(), 'quote': text, 'author': f'Author {rng.randrange(size // 10 + 1)}',
+             'category_id': rng.choice(category_ids), 'user_id': user_id, 'approved': True,
+             'status': Quote.APPROVED, 'created_at': started + timedelta(seconds=i),
+             'updated_at': started + timedelta(seconds=i)}
+            for i, text in enumerate(generate(size, seed=size))]
+    with engine.begin() as connection:
+        connection.execute(delete(Quote))
+        for i in range(0, size, 10000):
+            connection.execute(insert(Quote), rows[i:i + 10000])
+    quote_search.rebuild()
+
+
+def run_cases(sizes: list) -> dict:
+    '''Runs every benchmark case and returns the results by case name.'''
+    fixtures = set_up()
+    user_id = fixtures['user_id']
+    client = app.test_client()
+    results = {}
+
+    def in_app_context(function):
+        def call():
+            with app.app_context():
+                function()
+        return call
+
+    results['load_user (cached)'] = measure(in_app_context(lambda: load_user(user_id)), 2000)
+    results['load_user (database)'] = measure(in_app_context(lambda: load_snapshot(user_id)), 500)
+
+    def authenticate_user():
+        response = expect(client.post('/auth/login', data={'email_address': 'benchmark@example.com',
+                                                           'password': PASSWORD}), 302)
+        if not response.location.endswith('/quotes'):
+            raise SystemExit(f'Logging in redirected to {response.location}')
+
+    results['authenticate_user'] = measure(authenticate_user, 10, 1)
+
+    with app.test_request_context():
+        results['QuoteForm()'] = measure(QuoteForm, 2000)
+        results['LoginForm()'] = measure(LoginForm, 2000)
+        results['RegisterForm()'] = measure(RegisterForm, 2000)
+
+    # the client is logged in by the authenticate_user case
+    texts = iter(generate(100000, seed=1))
+    category_id = fixtures['category_ids'][0]
+
+    def create_quote():
+        expect(client.post('/quotes/add', data={'quote': next(texts), 'author': 'Benchmark',
+                                                'category_id': category_id}), 302)
+
+    results['create_quote'] = measure(create_quote, 200)
+    worker = ModerationWorker(batch_size=64)
+
+    def moderate():
+        if worker.run_once() != 64:
+            raise SystemExit('The moderation worker did not score the 64 new quotes')
+        remove_session()
+
+    results['moderate 64 quotes'] = measure(moderate, 10, 1, setup=lambda: [create_quote() for _ in range(64)])
+
+    for size in sizes:
+        fill_quotes(size, user_id, fixtures['category_ids'])
+        with engine.connect() as connection:
+            quote_id = connection.execute(select(Quote.id).offset(size // 2).limit(1)).scalar()
+        results[f'GET /api/v1/quotes/<id> ({size} rows)'] = measure(
+            lambda: expect(client.get(f'/api/v1/quotes/{quote_id}'), 200), 500)
+        results[f'GET /api/v1/quotes ({size} rows)'] = measure(
+            lambda: expect(client.get('/api/v1/quotes?limit=20'), 200), 500)
+        results[f'GET /api/v1/quotes/search ({size} rows)'] = measure(
+            lambda: expect(client.get('/api/v1/quotes/search?q=courage+dream'), 200), 200)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    '''
+    Compares results with a baseline.
+
+    Returns:
+        list: (name, baseline median, median, change) of the cases whose
+        median grew by more than threshold (0.25 = 25% slower).
+    '''
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before:
+            change = result['median_us'] / before['median_us'] - 1
+            if change > threshold:
+                regressions.append((name, before['median_us'], result['median_us'], change))
+    return regressions
+
+
+def current_commit() -> str:
+    '''Returns the checked out commit, or None outside of a git checkout.'''
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    '''Runs the benchmarks.'''
+    parser = argparse.ArgumentParser(description='Benchmark the request hot paths.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000],
+                        help='numbers of quotes the API endpoints are measured with')
+    parser.add_argument('--output', '-o', help='JSON file to save the results to')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown of a median that fails the comparison (default: 0.25)')
+    args = parser.parse_args()
+
+    try:
+        results = run_cases(args.sizes)
+    finally:
+        engine.dispose()
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    print(f'{"case":<45} {"median":>10} {"p95":>10} {"baseline":>10} {"change":>8}')
+    for name, result in results.items():
+        line = f'{name:<45} {result["median_us"]:>8.0f}us {result["p95_us"]:>8.0f}us'
+        if name in baseline:
+            change = result['median_us'] / baseline[name]['median_us'] - 1
+            line += f' {baseline[name]["median_us"]:>8.0f}us {change:>+7.0%}'
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': current_commit(), 'created_at': datetime.utcnow().isoformat(),
+                       'python': platform.python_version(), 'machine': platform.machine(),
+                       'bcrypt_rounds': app.config['BCRYPT_ROUNDS'], 'results': results}, f, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f'{name}: {before:.0f}us -> {after:.0f}us ({change:+.0%})', file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
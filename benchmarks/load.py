@@ -0,0 +1,359 @@
+'''
+Load test driver with a scaling report.
+
+Simulates concurrent visitors: each client logs in as one of the users made
+by benchmarks.datagen and then keeps picking a request from a weighted mix
+of API and web pages for the duration of the run. For every endpoint it
+reports the throughput, the latency percentiles and, when the app runs in
+this process, the number of SQL queries per request.
+
+In-process runs use a throwaway SQLite database and grow it through the
+given sizes, measuring each one, to show how the app scales with data:
+
+    python -m benchmarks.load --sizes 10000 100000 1000000 --clients 16 --duration 10
+
+Against a running server, generate the data first, then drive it over HTTP:
+
+    python -m benchmarks.datagen --quotes 1000000 --users 100000
+    python -m benchmarks.load --url http://localhost:5000 --users 100000 --clients 32
+'''
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from sqlalchemy import event
+
+# ids of approved quotes sampled from the first API pages
+SAMPLE_SIZE = 1000
+
+SEARCH_TERMS = ['courage', 'dream', 'einstein', 'angelou', 'journey', 'hope work', 'great work',
+                'sunshine', 'mandela', 'patience', 'impossible', 'goal dream']
+
+QUOTE_ID = re.compile(r'/api/v1/quotes/([0-9a-f-]{36})')
+
+
+class HttpClient:
+    '''Sends requests to a running server, keeping the login session cookie.'''
+
+    def __init__(self, base_url: str):
+        '''Initialize HTTP client.'''
+        self.base_url = base_url.rstrip('/')
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect())
+
+    def request(self, method: str, path: str, data: dict = None) -> tuple:
+        '''Returns the status, headers and body of a response.'''
+        body = urllib.parse.urlencode(data).encode('utf-8') if data is not None else None
+        try:
+            with self._opener.open(urllib.request.Request(self.base_url + path, body, method=method)) as response:
+                return response.status, response.headers, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers, e.read()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    '''Returns redirects as they are, like the Flask test client does.'''
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class TestClient:
+    '''Sends requests to the app in this process through the Flask test client.'''
+
+    def __init__(self, app):
+        '''Initialize test client.'''
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, data: dict = None) -> tuple:
+        '''Returns the status, headers and body of a response.'''
+        response = self._client.open(path, method=method, data=data)
+        return response.status_code, response.headers, response.get_data()
+
+
+class QueryCounter:
+    '''Counts the SQL statements sent by each thread.'''
+
+    def __init__(self, engine):
+        '''Initialize query counter.'''
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args) -> None:
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self) -> None:
+        '''Starts counting the statements of the current thread from zero.'''
+        self._local.count = 0
+
+    def value(self) -> int:
+        '''Returns the number of statements sent by the current thread since the last reset.'''
+        return getattr(self._local, 'count', 0)
+
+
+class Visitor:
+    '''A simulated visitor picking requests from a weighted mix.'''
+
+    def __init__(self, client, username: str, password: str, quote_ids: list, rng: random.Random):
+        '''Initialize visitor.'''
+        self.client = client
+        self.username = username
+        self.password = password
+        self.quote_ids = quote_ids
+        self.rng = rng
+        self.next_page = None
+        self.mix = [
+            ('GET /api/v1/quotes', 25, self.list_quotes),
+            ('GET /api/v1/quotes/<id>', 20, lambda: ('GET', f'/api/v1/quotes/{self.rng.choice(self.quote_ids)}')),
+            ('GET /api/v1/quotes/search', 10,
+             lambda: ('GET', '/api/v1/quotes/search?' + urllib.parse.urlencode({'q': self.rng.choice(SEARCH_TERMS)}))),
+            ('GET /api/v1/quotes/random', 15, lambda: ('GET', '/api/v1/quotes/random')),
+            ('GET /api/v1/quotes/today', 5, lambda: ('GET', '/api/v1/quotes/today')),
+            ('GET /quotes', 10, lambda: ('GET', '/quotes')),
+            ('GET /', 15, lambda: ('GET', '/')),
+        ]
+        self.weights = [weight for _, weight, _ in self.mix]
+
+    def list_quotes(self) -> tuple:
+        '''Reads the quotes page by page, starting over now and then.'''
+        if self.next_page and self.rng.random() < 0.8:
+            return 'GET', '/api/v1/quotes?' + urllib.parse.urlencode({'limit': 20, 'cursor': self.next_page})
+        return 'GET', '/api/v1/quotes?limit=20'
+
+    def log_in(self) -> tuple:
+        '''Logs in, returning the status and the seconds it took.'''
+        started = time.perf_counter()
+        status, _, _ = self.client.request('POST', '/auth/login',
+                                        {'email_address': f'{self.username}@example.com', 'password': self.password})
+        return status, time.perf_counter() - started
+
+    def step(self) -> tuple:
+        '''
+        Sends one request from the mix.
+
+        Returns:
+            tuple: (endpoint, status, seconds).
+        '''
+        name, _, build = self.rng.choices(self.mix, weights=self.weights)[0]
+        method, path = build()
+        started = time.perf_counter()
+        status, headers, _ = self.client.request(method, path)
+        elapsed = time.perf_counter() - started
+        if name == 'GET /api/v1/quotes':
+            self.next_page = headers.get('X-Next-Cursor')
+        return name, status, elapsed
+
+
+def percentile(values: list, fraction: float) -> float:
+    '''Returns the value below which the given fraction of the sorted values fall.'''
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run_load(make_client, usernames: list, password: str, quote_ids: list, clients: int,
+             duration: float, counter: QueryCounter = None, seed: int = 0) -> dict:
+    '''
+    Runs concurrent visitors for duration seconds.
+
+    Args:
+        make_client: A function returning a new client for each visitor.
+        usernames (list): The users the visitors log in as.
+        password (str): The password of those users.
+        quote_ids (list): Ids of approved quotes to request.
+        clients (int): The number of concurrent visitors.
+        duration (float): The seconds to run for, after logging in.
+        counter (QueryCounter): Counts the SQL statements of in-process requests.
+        seed (int): The random seed.
+
+    Returns:
+        dict: The statistics of each endpoint, and of all of them together under 'total'.
+    '''
+    samples = {}  # endpoint -> list of (status, seconds, queries)
+    lock = threading.Lock()
+    ready = threading.Barrier(clients + 1)
+    stop = threading.Event()
+
+    def record(name, status, elapsed, queries):
+        with lock:
+            samples.setdefault(name, []).append((status, elapsed, queries))
+
+    def visit(number: int) -> None:
+        rng = random.Random(seed * 1000 + number)
+        try:
+            visitor = Visitor(make_client(), rng.choice(usernames), password, quote_ids, rng)
+            if counter:
+                counter.reset()
+            status, elapsed = visitor.log_in()
+        except Exception:
+            ready.abort()  # do not leave the other threads waiting
+            raise
+        record('POST /auth/login', status, elapsed, counter.value() if counter else None)
+        ready.wait()
+        while not stop.is_set():
+            if counter:
+                counter.reset()
+            name, status, elapsed = visitor.step()
+            record(name, status, elapsed, counter.value() if counter else None)
+
+    threads = [threading.Thread(target=visit, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()  # every visitor has logged in
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for name, values in sorted(samples.items()):
+        report[name] = summarize(values, None if name == 'POST /auth/login' else elapsed)
+    report['total'] = summarize([value for name, values in samples.items() if name != 'POST /auth/login'
+                                 for value in values], elapsed)
+    return report
+
+
+def summarize(values: list, elapsed: float = None) -> dict:
+    '''Computes the throughput, latency percentiles, errors and queries per request of samples.'''
+    latencies = sorted(seconds * 1000 for _, seconds, _ in values)
+    queries = [count for _, _, count in values if count is not None]
+    return {
+        'requests': len(values),
+        'errors': sum(1 for status, _, _ in values if status >= 400),
+        'throughput': round(len(values) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'queries': round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def print_report(size, report: dict) -> None:
+    '''Prints the statistics of a run.'''
+    print(f'\n{size if size is not None else "server"} quotes')
+    print(f'{"endpoint":<28} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} '
+          f'{"p99 ms":>8} {"queries":>8}')
+    for name, stats in report.items():
+        throughput = f'{stats["throughput"]:.1f}' if stats['throughput'] is not None else '-'
+        queries = f'{stats["queries"]:.1f}' if stats['queries'] is not None else '-'
+        print(f'{name:<28} {stats["requests"]:>9} {stats["errors"]:>7} {throughput:>8} {stats["p50_ms"]:>8.1f} '
+              f'{stats["p95_ms"]:>8.1f} {stats["p99_ms"]:>8.1f} {queries:>8}')
+
+
+def verified_usernames(users: int) -> list:
+    '''Returns the usernames of the first users made by benchmarks.datagen that can log in.'''
+    from .datagen import is_verified
+
+    return [f'user{i}' for i in range(users) if is_verified(i)]
+
+
+def sample_quote_ids(client) -> list:
+    '''Collects ids of approved quotes from the first pages of the API.'''
+    ids = []
+    path = '/api/v1/quotes?limit=100'
+    while path and len(ids) < SAMPLE_SIZE:
+        status, headers, body = client.request('GET', path)
+        if status != 200:
+            raise SystemExit(f'GET {path} returned {status}')
+        ids.extend(QUOTE_ID.search(quote['quote_url']).group(1) for quote in json.loads(body))
+        cursor = headers.get('X-Next-Cursor')
+        path = '/api/v1/quotes?' + urllib.parse.urlencode({'limit': 100, 'cursor': cursor}) if cursor else None
+    if not ids:
+        raise SystemExit('There are no approved quotes, generate some with benchmarks.datagen')
+    return ids
+
+
+def run_in_process(sizes: list, users: int, clients: int, duration: float) -> dict:
+    '''
+    Grows a throwaway SQLite database through the given sizes and loads the app at each one.
+
+    Returns:
+        dict: The report of each size.
+    '''
+    work_dir = tempfile.mkdtemp(prefix='motiquote-load-')
+    os.environ['DATABASE_URL'] = f'sqlite:///{work_dir}/load.db'
+    os.environ['STATE_DIR'] = work_dir
+    os.environ.setdefault('SECRET_KEY', 'load-test')
+
+    from sqlalchemy import func, select
+    from app import create_app
+    from app.database.db import engine
+    from app.models.models import User
+    from app.quotes.sampling import quote_sampler
+    from app.search.quotes import quote_search
+    from .datagen import grow, PASSWORD
+
+    app = create_app()
+    counter = QueryCounter(engine)
+    reports = {}
+    try:
+        for size in sizes:
+            print(f'Generating {size} quotes...', flush=True)
+            grow(size, min(users, max(size // 10, clients)))
+            quote_search.rebuild()
+            quote_sampler.load()
+            with engine.connect() as connection:
+                usernames = verified_usernames(connection.execute(select(func.count()).select_from(User)).scalar())
+            quote_ids = sample_quote_ids(TestClient(app))
+            reports[size] = run_load(lambda: TestClient(app), usernames, PASSWORD, quote_ids,
+                                     clients, duration, counter)
+            print_report(size, reports[size])
+    finally:
+        engine.dispose()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return reports
+
+
+def print_scaling(reports: dict) -> None:
+    '''Prints how the median latency and queries of each endpoint change with the data size.'''
+    sizes = list(reports)
+    print(f'\n{"p50 ms / queries":<28} ' + ' '.join(f'{size:>16}' for size in sizes))
+    for name in reports[sizes[0]]:
+        cells = []
+        for size in sizes:
+            stats = reports[size].get(name)
+            cells.append(f'{stats["p50_ms"]:>8.1f} / {stats["queries"] or 0:>5.1f}' if stats else f'{"-":>16}')
+        print(f'{name:<28} ' + ' '.join(cells))
+
+
+def main() -> None:
+    '''Runs the load test.'''
+    parser = argparse.ArgumentParser(description='Load test the app with concurrent simulated visitors.')
+    parser.add_argument('--url', help='base URL of a running server (default: run the app in this process)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='numbers of quotes to measure at, in-process only')
+    parser.add_argument('--users', type=int, default=100000,
+                        help='number of generated users (user0 to user<N-1>) visitors log in as')
+    parser.add_argument('--clients', type=int, default=16, help='number of concurrent visitors')
+    parser.add_argument('--duration', type=float, default=10, help='seconds each run lasts')
+    parser.add_argument('--output', '-o', help='JSON file to save the reports to')
+    args = parser.parse_args()
+
+    if args.url:
+        from .datagen import PASSWORD
+        usernames = verified_usernames(args.users)
+        quote_ids = sample_quote_ids(HttpClient(args.url))
+        reports = {'server': run_load(lambda: HttpClient(args.url), usernames, PASSWORD, quote_ids,
+                                      args.clients, args.duration)}
+        print_report(None, reports['server'])
+    else:
+        reports = run_in_process(args.sizes, args.users, args.clients, args.duration)
+        print_scaling(reports)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'clients': args.clients, 'duration': args.duration, 'reports': reports}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+'''
+Benchmark of the in-memory search index.
+
+Fills an InvertedIndex with synthetic quotes, whose words follow a Zipf
+distribution over common English words and a long tail of rarer ones, and
+times queries against it: a frequent term, several terms, and a prefix.
+The database is not used.
+
+Usage:
+    python -m benchmarks.search [--sizes 100000 1000000] [--runs 20]
+                                [--queries life "love time" lif]
+'''
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+from itertools import accumulate
+
+# the app only needs a database to be importable, not to be reachable
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{tempfile.gettempdir()}/motiquote-benchmark.db')
+
+from app.search.index import InvertedIndex
+from app.search.quotes import FIELDS
+
+QUERIES = ['life', 'love time', 'lif']
+
+WORDS = '''
+life love time work dream courage hope change people world heart success
+mind today never always great good failure light journey believe strength
+happiness future past moment friend fear peace truth power lifetime lift
+lively lives living loved lovely lover timeless timer kindness patience
+'''.split()
+AUTHORS = ['Albert Einstein', 'Maya Angelou', 'Nelson Mandela', 'Marie Curie', 'Mark Twain',
+           'Ada Lovelace', 'Kwame Nkrumah', 'Frida Kahlo', 'Lao Tzu', 'Helen Keller']
+
+# number of made up words making the long tail of the vocabulary
+RARE_WORDS = 50000
+
+
+def vocabulary(seed: int = 0) -> tuple:
+    '''Returns the words quotes are made of, with the cumulative weights of a Zipf distribution.'''
+    rng = random.Random(seed)
+    rare = {''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(RARE_WORDS)}
+    words = WORDS + sorted(rare - set(WORDS))
+    return words, list(accumulate(1 / rank ** 1.1 for rank in range(1, len(words) + 1)))
+
+
+def build(size: int, seed: int = 0) -> InvertedIndex:
+    '''Returns an index of size synthetic quotes.'''
+    rng = random.Random(seed)
+    words, weights = vocabulary(seed)
+    index = InvertedIndex(FIELDS)
+    for number in range(size):
+        quote = ' '.join(rng.choices(words, cum_weights=weights, k=rng.randint(6, 20)))
+        index.add(number, quote=quote, author=rng.choice(AUTHORS))
+    return index
+
+
+def measure(index: InvertedIndex, query: str, runs: int) -> dict:
+    '''Times a query, returning the median and 95th percentile in milliseconds.'''
+    index.search(query)  # warm up
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        index.search(query)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {'median_ms': statistics.median(timings),
+            'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))]}
+
+
+def main() -> None:
+    '''Runs the benchmark.'''
+    parser = argparse.ArgumentParser(description='Benchmark the search index.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000],
+                        help='numbers of quotes in the index')
+    parser.add_argument('--runs', type=int, default=20, help='times each query is run')
+    parser.add_argument('--queries', nargs='+', default=QUERIES, help='queries to time')
+    args = parser.parse_args()
+
+    print(f'{"documents":>10} {"query":<20} {"matches":>9} {"median":>10} {"p95":>10}')
+    for size in args.sizes:
+        start = time.perf_counter()
+        index = build(size)
+        print(f'{size:>10} {"(build)":<20} {"":>9} {time.perf_counter() - start:>9.1f}s')
+        for query in args.queries:
+            matches = len(index.search(query, limit=size))
+            result = measure(index, query, args.runs)
+            print(f'{size:>10} {query:<20} {matches:>9} {result["median_ms"]:>8.1f}ms {result["p95_ms"]:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+'''
+Benchmark of the batch sentiment engine against TextBlob.
+
+Scores the same synthetic quotes with TextBlob(text).sentiment.polarity, one
+call per quote as create_quote used to, and with the engine in a single batch,
+then checks that both agree.
+
+Usage:
+    python -m benchmarks.sentiment [--sizes 1 1000 100000]
+'''
+import argparse
+import os
+import random
+import tempfile
+import time
+
+# the app only needs a database to be importable, not to be reachable
+os.environ.setdefault('DATABASE_URL', f'sqlite:///{tempfile.gettempdir()}/motiquote-benchmark.db')
+
+import numpy as np
+from textblob import TextBlob
+from app.moderation.sentiment import SentimentEngine
+
+TOLERANCE = 0.0
+
+QUOTES = [
+    "The only way to do great work is to love what you do.",
+    "Believe you can and you're halfway there.",
+    "Don't watch the clock; do what it does. Keep going!",
+    "Success is not final, failure is not fatal: it is the courage to continue that counts.",
+    "It always seems impossible until it's done.",
+    "You are never too old to set another goal or to dream a new dream.",
+    "Hardships often prepare ordinary people for an extraordinary destiny.",
+    "Life is really beautiful, and you are not alone!!",
+    "What you get by achieving your goals is not as important as what you become.",
+    "Keep your face always toward the sunshine :) and shadows will fall behind you.",
+]
+
+
+def generate(size: int, seed: int = 0) -> list:
+    '''Generates distinct quotes by combining sentences from QUOTES.'''
+    rng = random.Random(seed)
+    return [f'{rng.choice(QUOTES)} {rng.choice(QUOTES)} #{i}' for i in range(size)]
+
+
+def textblob_polarity(texts: list) -> np.ndarray:
+    '''Scores texts one at a time with TextBlob.'''
+    return np.array([TextBlob(text).sentiment.polarity for text in texts])
+
+
+def measure(function, texts: list) -> tuple:
+    '''Returns the result of function(texts) and the seconds it took.'''
+    start = time.perf_counter()
+    result = function(texts)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    '''Runs the benchmark.'''
+    parser = argparse.ArgumentParser(description='Benchmark the sentiment engine against TextBlob.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 100000],
+                        help='numbers of quotes to score')
+    args = parser.parse_args()
+
+    engine, load_time = measure(lambda _: SentimentEngine(), None)
+    TextBlob('warm up').sentiment  # load TextBlob's lexicon outside of the timings
+    print(f'engine lexicon load: {load_time * 1000:.1f} ms')
+    print(f'{"quotes":>8} {"textblob":>12} {"engine":>12} {"speedup":>8} {"max diff":>9}')
+
+    for size in args.sizes:
+        texts = generate(size)
+        expected, textblob_time = measure(textblob_polarity, texts)
+        actual, engine_time = measure(engine.polarity, texts)
+        difference = float(np.abs(expected - actual).max())
+        print(f'{size:>8} {textblob_time:>11.4f}s {engine_time:>11.4f}s '
+              f'{textblob_time / engine_time:>7.1f}x {difference:>9.2g}')
+        if difference > TOLERANCE:
+            raise SystemExit(f'engine differs from TextBlob by {difference} on {size} quotes')
+
+
+if __name__ == '__main__':
+    main()
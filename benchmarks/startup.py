@@ -0,0 +1,128 @@
+'''
+Startup time of the app.
+
+Imports the app and calls create_app in fresh interpreters, as a server
+worker does when it boots, against a database URL that cannot be opened:
+creating the app must not touch the database. Reports the median time to
+create the app and to run the whole interpreter and the import time of each
+package, measured with `python -X importtime`, and fails when creating the
+app takes longer than the budget or pulls in the NLP stack.
+
+Usage:
+    python -m benchmarks.startup [--runs 5] [--budget 0.5] [--top 15]
+'''
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# default number of seconds creating the app may take
+BUDGET = 0.5
+
+# modules only the moderation workers and the first search need
+HEAVY_MODULES = ('nltk', 'numpy', 'textblob')
+
+CODE = f'''
+import sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+print(__import__('json').dumps({{'seconds': time.perf_counter() - started,
+                                'heavy': [name for name in {HEAVY_MODULES!r} if name in sys.modules]}}))
+'''
+
+
+def environment(work_dir: str) -> dict:
+    '''Returns the environment of the measured interpreters.'''
+    env = dict(os.environ)
+    # a database that cannot be opened, so any query made while starting fails
+    env['DATABASE_URL'] = f'sqlite:///{work_dir}/missing/startup.db'
+    env['STATE_DIR'] = work_dir
+    env.setdefault('SECRET_KEY', 'startup')
+    return env
+
+
+def start(env: dict, importtime: bool = False) -> tuple:
+    '''
+    Creates the app in a new interpreter.
+
+    Returns:
+        tuple: (result, wall time in seconds, stderr) where result holds the
+        time create_app took and the heavy modules it imported.
+    '''
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', CODE]
+    started = time.perf_counter()
+    process = subprocess.run(command, env=env, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise SystemExit(f'Creating the app failed:\n{process.stderr}')
+    return json.loads(process.stdout.splitlines()[-1]), wall, process.stderr
+
+
+def import_times(importtime: str, top: int) -> list:
+    '''
+    Adds up the import time of the modules of each package.
+
+    Args:
+        importtime (str): The output of `python -X importtime`.
+        top (int): The number of packages returned.
+
+    Returns:
+        list: (package, microseconds, number of modules) tuples, slowest first.
+    '''
+    packages = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        microseconds, modules = packages.get(package, (0, 0))
+        packages[package] = (microseconds + int(own), modules + 1)
+    return sorted(((package, microseconds, modules) for package, (microseconds, modules) in packages.items()),
+                  key=lambda item: item[1], reverse=True)[:top]
+
+
+def main() -> None:
+    '''Measures the startup time.'''
+    parser = argparse.ArgumentParser(description='Measure how long creating the app takes.')
+    parser.add_argument('--runs', type=int, default=5, help='number of interpreters started')
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help='seconds creating the app may take (default: 0.5)')
+    parser.add_argument('--top', type=int, default=15, help='number of packages listed')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='motiquote-startup-')
+    try:
+        env = environment(work_dir)
+        start(env)  # warm the bytecode caches
+        runs = [start(env) for _ in range(args.runs)]
+        result, _, importtime = start(env, importtime=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    create = statistics.median(result['seconds'] for result, _, _ in runs)
+    wall = statistics.median(wall for _, wall, _ in runs)
+    print(f'create_app: {create * 1000:.0f}ms (median of {args.runs}), whole interpreter: {wall * 1000:.0f}ms')
+    print(f'\n{"package":<30} {"import time":>11} {"modules":>8}')
+    for package, microseconds, modules in import_times(importtime, args.top):
+        print(f'{package:<30} {microseconds / 1000:>9.1f}ms {modules:>8}')
+
+    failures = []
+    if create > args.budget:
+        failures.append(f'creating the app took {create * 1000:.0f}ms, over the budget of {args.budget * 1000:.0f}ms')
+    if result['heavy']:
+        failures.append(f'creating the app imported {", ".join(result["heavy"])}')
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+'''
+Production server settings, read by gunicorn from the current directory:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is created once in the master process (preload_app), which then
+loads the data every worker needs and forks the workers, so they share it
+copy-on-write. Each worker opens its database connections before it
+accepts requests. Every setting can be overridden on the command line or
+through the environment variables below.
+'''
+import multiprocessing
+import os
+import time
+
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# requests mostly wait on the database, so each worker serves several at once on
+# threads; one worker per CPU keeps the Python code of all of them running in parallel
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# replace workers now and then, at different times, to bound any memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # '-' for stdout
+
+
+def when_ready(server):
+    '''Loads the shared data in the master once the app is created, before any worker is forked.'''
+    from app.warmup import load_shared_data
+
+    started = time.perf_counter()
+    load_shared_data(server.app.wsgi())
+    server.log.info('Master warmed up in %.1fs', time.perf_counter() - started)
+
+
+def post_fork(server, worker):
+    '''Drops any connection inherited from the master, it must not be used by two processes.'''
+    from app.database.db import engine
+
+    engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    '''Opens a connection per thread before the worker accepts requests.'''
+    from app.database import DB_POOL_SIZE
+    from app.warmup import open_connections
+
+    opened = open_connections(min(worker.cfg.threads, DB_POOL_SIZE))
+    worker.log.info('Worker %s opened %d database connections', worker.pid, opened)
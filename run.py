@@ -1,4 +1,16 @@
-from app import app
+from app import create_app, mail
+from app.database.migrate import upgrade
+from app.outbox.worker import OutboxWorker
+
+app = create_app()
 
 if __name__ == '__main__':
+    from app.moderation.worker import ModerationWorker  # loads the NLP stack, which the app itself never needs
+
+    upgrade()  # production runs `python -m app.database.migrate` before deploying
+
+    # moderate new quotes and send emails in this process while developing, production runs
+    # `python -m app.moderation.worker` and `python -m app.outbox.worker` next to the server
+    ModerationWorker().start()
+    OutboxWorker(app, mail).start()
     app.run(host='0.0.0.0', port=5000, debug=True)